@@ -103,6 +103,11 @@ if 'show_visual_layout' not in st.session_state:
     st.session_state.show_visual_layout = False
 
 def main():
+    # Debug toggles for verbose Nano Banana Pro diagnostics (off by default)
+    with st.sidebar.expander("🛠️ Debug Options", expanded=False):
+        st.checkbox("Show reference image processing log", key="debug_refs")
+        st.checkbox("Show Nano Banana Pro API call details", key="nbp_debug")
+    
     # Visual Layout Generator Interface (Full Width) - Check before main UI
     if st.session_state.get('show_visual_layout', False):
         from utils.visual_layout_interface import show_visual_layout_generator
@@ -6,7 +6,7 @@ echo "================================="
 
 # Check if Python is installed
 if ! command -v python &> /dev/null; then
-    echo "❌ Python is not installed. Please install Python 3.8+ first."
+    echo "❌ Python is not installed. Please install Python 3.10+ first."
     exit 1
 fi
 
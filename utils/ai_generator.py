@@ -1,14 +1,367 @@
 from openai import OpenAI
 import requests
 import io
+import numpy as np
 from PIL import Image
 import os
 from typing import Optional, Tuple
 import streamlit as st
 import time
+import hashlib
+import struct
+import threading
+import functools
 from .prompts import PromptBuilder
 from .config import EnvironmentManager
 
+# Import the Gemini SDK once at startup so the first generation doesn't pay for it
+try:
+    import google.generativeai as genai
+    _GENAI_AVAILABLE = True
+except ImportError:
+    genai = None
+    _GENAI_AVAILABLE = False
+
+# Optional SIMD-accelerated resizing via OpenCV (falls back to Pillow)
+try:
+    import cv2
+    _HAS_CV2 = True
+except ImportError:
+    cv2 = None
+    _HAS_CV2 = False
+
+NBP_MODEL_NAME = 'gemini-3-pro-image-preview'
+
+@functools.lru_cache(maxsize=4)
+def _get_nbp_model(api_key: str):
+    """Build the Nano Banana Pro model once per API key.
+    
+    genai.configure() is process-global and the model binds to whichever key is
+    configured at its first request, so callers must configure the key before use.
+    """
+    return genai.GenerativeModel(NBP_MODEL_NAME)
+
+# On-disk cache for Nano Banana Pro results (content-addressed by prompt + references)
+NBP_CACHE_DIR = os.path.join("assets", ".nbp_cache")
+NBP_CACHE_MAX_BYTES = 1024 * 1024 * 1024  # 1 GB
+NBP_CACHE_TRIM_INTERVAL = 20  # Trim the cache once every N inserts
+_nbp_cache_inserts = 0
+
+class _TokenBucket:
+    """Process-wide token bucket that shapes requests before they reach the API"""
+    
+    def __init__(self, rpm: float):
+        self.rate = rpm / 60.0
+        self.capacity = float(rpm)
+        self.tokens = float(rpm)
+        self.ts = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Block until a request token is available, then consume it"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.ts) * self.rate)
+            self.ts = now
+            if self.tokens < 1:
+                # Sleep while holding the lock so waiting callers are served in order
+                time.sleep((1 - self.tokens) / self.rate)
+                self.ts = time.monotonic()
+                self.tokens = 1
+            self.tokens -= 1
+
+def _configured_gemini_rpm() -> float:
+    """Gemini requests-per-minute budget (GEMINI_RPM in secrets/.env, default 60)"""
+    try:
+        rpm = float(EnvironmentManager.get_config_value("GEMINI_RPM", 60))
+        return rpm if rpm > 0 else 60.0
+    except (TypeError, ValueError):
+        return 60.0
+
+# Rate limiting for Nano Banana Pro: shape request rate and cap concurrent sockets
+NBP_MAX_IN_FLIGHT = 4
+_NBP_BUCKET = None
+_NBP_BUCKET_LOCK = threading.Lock()
+_NBP_SEM = threading.Semaphore(NBP_MAX_IN_FLIGHT)
+
+def _get_nbp_bucket() -> _TokenBucket:
+    """Process-wide token bucket, built on first use so GEMINI_RPM from .env is honoured"""
+    global _NBP_BUCKET
+    if _NBP_BUCKET is None:
+        with _NBP_BUCKET_LOCK:
+            if _NBP_BUCKET is None:
+                _NBP_BUCKET = _TokenBucket(_configured_gemini_rpm())
+    return _NBP_BUCKET
+
+@functools.lru_cache(maxsize=256)
+def _cached_nbp_prompt(base_prompt, use_search_grounding, text_rendering_mode):
+    """Memoized Nano Banana Pro prompt build - Streamlit reruns hit this repeatedly"""
+    return PromptBuilder.build_nano_banana_pro_prompt(base_prompt, use_search_grounding, text_rendering_mode)
+
+@functools.lru_cache(maxsize=256)
+def _cached_detect_features(prompt):
+    """Memoized advanced feature detection keyed by prompt"""
+    return PromptBuilder.detect_advanced_features(prompt)
+
+def _resize_to_size(image: Image.Image, size: Tuple[int, int]) -> Image.Image:
+    """Resize a generated image to the target size, skipping no-op resizes.
+    
+    Downscales use Pillow's reducing_gap so a cheap box reduction runs before
+    LANCZOS. Upscales use OpenCV's INTER_LANCZOS4 when opencv is installed and
+    plain Pillow LANCZOS otherwise.
+    """
+    size = tuple(size)
+    if image.size == size:
+        return image
+    if image.size[0] > size[0] and image.size[1] > size[1]:
+        return image.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+    if _HAS_CV2 and image.mode in ("RGB", "RGBA", "L"):
+        # OpenCV's vectorized Lanczos beats Pillow's when there is no reduction to shortcut
+        resized = cv2.resize(np.asarray(image), size, interpolation=cv2.INTER_LANCZOS4)
+        return Image.fromarray(resized)
+    return image.resize(size, Image.Resampling.LANCZOS)
+
+B64_STREAM_THRESHOLD = 1024 * 1024  # Payloads above 1 MB are decoded in chunks
+B64_STREAM_CHUNK = 64 * 1024  # Multiple of 4 so chunks split on base64 quantum boundaries
+
+def _b64_stream_decode(data) -> bytearray:
+    """Decode a large base64 payload in chunks into a single preallocated buffer
+    
+    Avoids materializing an encoded bytes copy plus a decoded copy at the same time.
+    Small payloads and payloads containing whitespace use a plain b64decode.
+    """
+    import base64
+    import binascii
+    
+    if isinstance(data, str):
+        data = data.encode('ascii')
+    if len(data) < B64_STREAM_THRESHOLD or len(data) % 4:
+        return bytearray(base64.b64decode(data))
+    
+    view = memoryview(data)
+    padding = len(data) - len(data.rstrip(b"="))
+    buffer = bytearray(len(data) // 4 * 3 - padding)
+    pos = 0
+    try:
+        for start in range(0, len(view), B64_STREAM_CHUNK):
+            chunk = binascii.a2b_base64(view[start:start + B64_STREAM_CHUNK])
+            buffer[pos:pos + len(chunk)] = chunk
+            pos += len(chunk)
+    except binascii.Error:
+        return bytearray(base64.b64decode(data))
+    if pos != len(buffer):
+        # Non-alphabet characters were skipped; fall back to the reference decoder
+        return bytearray(base64.b64decode(data))
+    return buffer
+
+def _is_url(ref_img) -> bool:
+    """Check whether a reference image is given as an http(s) URL"""
+    return isinstance(ref_img, str) and ref_img.startswith(("http://", "https://"))
+
+async def _fetch_reference_urls(urls: list) -> list:
+    """Fetch all reference URLs over one shared client (HTTP/2 multiplexed when h2 is installed)"""
+    import asyncio
+    import httpx
+    try:
+        import h2  # noqa: F401 - only needed to enable HTTP/2 in httpx
+        http2 = True
+    except ImportError:
+        http2 = False
+    
+    async with httpx.AsyncClient(http2=http2, timeout=10, follow_redirects=True) as client:
+        return await asyncio.gather(*[client.get(url) for url in urls], return_exceptions=True)
+
+def _resolve_url_references(reference_images: list) -> Tuple[list, list]:
+    """Replace URL references with their downloaded bytes, keeping the original order
+    
+    Returns:
+        (resolved reference list without failed downloads, list of (url, error) tuples)
+    """
+    import asyncio
+    
+    urls = [ref_img for ref_img in reference_images if _is_url(ref_img)]
+    responses = dict(zip(urls, asyncio.run(_fetch_reference_urls(urls))))
+    
+    resolved, errors = [], []
+    for ref_img in reference_images:
+        if not _is_url(ref_img):
+            resolved.append(ref_img)
+            continue
+        response = responses[ref_img]
+        if isinstance(response, Exception):
+            errors.append((ref_img, str(response)))
+        elif response.status_code != 200:
+            errors.append((ref_img, f"HTTP {response.status_code}"))
+        else:
+            resolved.append(response.content)
+    return resolved, errors
+
+# Restricting Image.open to these formats skips probing every registered Pillow plugin.
+# Other formats (GIF, BMP, TIFF, ...) must be enabled via NBP_EXTRA_IMAGE_FORMATS.
+@functools.lru_cache(maxsize=1)
+def _image_formats() -> Tuple[str, ...]:
+    """Pillow formats probed when decoding images (PNG/JPEG/WEBP plus NBP_EXTRA_IMAGE_FORMATS)
+    
+    Resolved on first use rather than at import, so values loaded from .env are seen.
+    """
+    extra = EnvironmentManager.get_config_value("NBP_EXTRA_IMAGE_FORMATS", "") or ""
+    formats = ["PNG", "JPEG", "WEBP"]
+    formats += [f.strip().upper() for f in str(extra).split(",") if f.strip() and f.strip().upper() not in formats]
+    return tuple(formats)
+
+def _sniff_image_mime(data: bytes) -> Optional[str]:
+    """Identify PNG/JPEG/WEBP payloads from their magic bytes"""
+    if data.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if data.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
+
+def _prepare_reference_part(ref_img) -> Tuple[object, Tuple[int, int], str]:
+    """Turn a reference image of any supported input type into a generate_content part
+    
+    PIL images are passed through untouched. Byte-backed inputs in PNG/JPEG/WEBP are
+    handed to the SDK as raw {'mime_type', 'data'} blobs, skipping a PIL decode and
+    re-encode; only the image header is parsed to learn the size.
+    
+    Returns:
+        (part, (width, height), short description of the source type)
+    """
+    # The zero-cost PIL check runs first since session state usually stores PIL images
+    if isinstance(ref_img, Image.Image):
+        return ref_img, ref_img.size, "PIL Image"
+    if isinstance(ref_img, (bytes, bytearray)):
+        data, source = bytes(ref_img), "raw bytes"
+    elif hasattr(ref_img, 'getvalue'):
+        # BytesIO / Streamlit UploadedFile - read the buffer without moving the cursor
+        data, source = ref_img.getvalue(), "BytesIO"
+    elif hasattr(ref_img, 'read'):
+        if hasattr(ref_img, 'seek'):
+            ref_img.seek(0)
+        data, source = ref_img.read(), "file object"
+    elif isinstance(ref_img, str) or hasattr(ref_img, '__fspath__'):
+        with open(ref_img, 'rb') as f:
+            data, source = f.read(), "file path"
+    else:
+        raise TypeError(f"Unsupported object type {type(ref_img)}")
+    
+    if not data:
+        raise ValueError("Empty or invalid image data")
+    
+    # Image.open is lazy: this only parses the header
+    header = Image.open(io.BytesIO(data), formats=_image_formats())
+    mime_type = _sniff_image_mime(data)
+    if mime_type is None:
+        # Unusual format - decode so the SDK receives a PIL image it can re-encode
+        header.load()
+        return header, header.size, f"{source} decoded"
+    return {"mime_type": mime_type, "data": data}, header.size, f"{source} as {mime_type}"
+
+# Reference images above this pixel budget are downscaled client-side before upload
+NBP_MAX_REFERENCE_PIXELS = 2048 * 2048
+NBP_MAX_REFERENCE_SIDE = 2048
+
+def _downscale_oversized_references(parts: list, sizes: list) -> Tuple[list, int]:
+    """Downscale reference images that exceed the Nano Banana Pro pixel budget
+    
+    All sizes are checked in a single numpy pass; only offending images are decoded
+    (if they are still raw blobs) and resized.
+    
+    Returns:
+        (list of parts, number of images that were downscaled)
+    """
+    if not parts:
+        return parts, 0
+    sizes = np.array(sizes, dtype=np.int64)
+    too_big = np.flatnonzero(sizes.prod(axis=1) > NBP_MAX_REFERENCE_PIXELS)
+    if too_big.size == 0:
+        return parts, 0
+    
+    parts = list(parts)
+    scales = NBP_MAX_REFERENCE_SIDE / sizes[too_big].max(axis=1)
+    for idx, scale in zip(too_big, scales):
+        width, height = sizes[idx]
+        new_size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        image = parts[idx]
+        if isinstance(image, dict):
+            image = Image.open(io.BytesIO(image["data"]), formats=_image_formats())
+        parts[idx] = image.resize(new_size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+    return parts, int(too_big.size)
+
+def _ref_bytes(ref_img) -> bytes:
+    """Return raw bytes identifying a reference image for cache keying"""
+    if isinstance(ref_img, Image.Image):
+        return ref_img.mode.encode() + struct.pack("!II", *ref_img.size) + ref_img.tobytes()
+    if isinstance(ref_img, (bytes, bytearray)):
+        return bytes(ref_img)
+    if hasattr(ref_img, 'getvalue'):
+        return ref_img.getvalue()
+    if hasattr(ref_img, 'read') and hasattr(ref_img, 'seek'):
+        ref_img.seek(0)
+        data = ref_img.read()
+        ref_img.seek(0)
+        return data
+    with open(ref_img, 'rb') as f:
+        return f.read()
+
+def _nbp_cache_key(enhanced_prompt, size, use_search_grounding, text_rendering_mode, reference_images) -> str:
+    """Build the SHA-256 cache key for a Nano Banana Pro request"""
+    key = hashlib.sha256()
+    key.update(enhanced_prompt.encode())
+    key.update(struct.pack("!II??", size[0], size[1], bool(use_search_grounding), bool(text_rendering_mode)))
+    for ref_img in (reference_images or [])[:14]:
+        key.update(hashlib.sha256(_ref_bytes(ref_img)).digest())
+    return key.hexdigest()
+
+def _load_cached_nbp_image(cache_key: str) -> Optional[Image.Image]:
+    """Load a cached Nano Banana Pro result, or None on miss"""
+    path = os.path.join(NBP_CACHE_DIR, f"{cache_key}.png")
+    if not os.path.exists(path):
+        return None
+    try:
+        image = Image.open(path, formats=_image_formats())
+        image.load()
+        # Refresh access time explicitly - many filesystems mount with noatime
+        os.utime(path)
+        return image
+    except Exception:
+        return None
+
+def _store_cached_nbp_image(cache_key: str, image: Image.Image):
+    """Persist a Nano Banana Pro result and periodically trim the cache"""
+    global _nbp_cache_inserts
+    try:
+        os.makedirs(NBP_CACHE_DIR, exist_ok=True)
+        image.save(os.path.join(NBP_CACHE_DIR, f"{cache_key}.png"), "PNG", optimize=False)
+        _nbp_cache_inserts += 1
+        if _nbp_cache_inserts % NBP_CACHE_TRIM_INTERVAL == 0:
+            _trim_nbp_cache()
+    except Exception:
+        # Caching is best-effort; never fail a generation because of it
+        pass
+
+def _trim_nbp_cache(max_bytes: int = NBP_CACHE_MAX_BYTES):
+    """Evict least-recently-used cache entries until the cache fits in max_bytes"""
+    entries = []
+    total = 0
+    with os.scandir(NBP_CACHE_DIR) as it:
+        for entry in it:
+            if entry.is_file() and entry.name.endswith(".png"):
+                stat = entry.stat()
+                entries.append((stat.st_atime, stat.st_size, entry.path))
+                total += stat.st_size
+    entries.sort()
+    for _, file_size, path in entries:
+        if total < max_bytes:
+            break
+        try:
+            os.unlink(path)
+            total -= file_size
+        except OSError:
+            continue
+
 class AIImageGenerator:
     """Handles AI image generation from multiple providers"""
     
@@ -16,6 +369,11 @@ class AIImageGenerator:
         self.model_name = model_name
         self.setup_model()
     
+    @functools.cached_property
+    def nbp_model(self):
+        """Nano Banana Pro GenerativeModel for this generator's Google API key (built once; configure the key before use)"""
+        return _get_nbp_model(self.google_api_key)
+    
     def setup_model(self):
         """Initialize the selected AI model"""
         if "DALL-E" in self.model_name:
@@ -352,13 +710,13 @@ class AIImageGenerator:
             if image_response.status_code != 200:
                 raise Exception(f"Failed to download image: HTTP {image_response.status_code}")
                 
-            image = Image.open(io.BytesIO(image_response.content))
+            image = Image.open(io.BytesIO(image_response.content), formats=_image_formats())
             st.success(f"✅ Image downloaded: {image.size[0]}x{image.size[1]}")
             
             # Resize to exact dimensions if needed
             if image.size != size:
                 st.info(f"🔄 Resizing from {image.size} to {size}")
-                image = image.resize(size, Image.Resampling.LANCZOS)
+                image = _resize_to_size(image, size)
             
             return image
             
@@ -367,6 +725,95 @@ class AIImageGenerator:
             st.error("💡 Check your OPENAI_API_KEY configuration and try again.")
             return None
     
+    def _prepare_dalle_edit_inputs(self, image: Image.Image, mask: Optional[Image.Image] = None) -> dict:
+        """Pad/scale an image (and optional mask) into DALL-E edit format: PNG, RGBA, square, max 1024px"""
+        # Convert to RGBA if not already
+        if image.mode != 'RGBA':
+            image = image.convert('RGBA')
+        
+        # DALL-E edit requires square images (1024x1024 max)
+        original_size = image.size
+        max_size = 1024
+        
+        # Make it square by padding
+        max_dim = max(image.size)
+        if max_dim > max_size:
+            # Scale down proportionally
+            scale = max_size / max_dim
+            new_width = int(image.size[0] * scale)
+            new_height = int(image.size[1] * scale)
+            image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+        
+        # Create square canvas
+        square_size = max(image.size)
+        square_image = Image.new('RGBA', (square_size, square_size), (255, 255, 255, 0))
+        # Center the image
+        offset = ((square_size - image.size[0]) // 2, (square_size - image.size[1]) // 2)
+        square_image.paste(image, offset)
+        
+        # Encode once; each request wraps the bytes in its own buffer
+        image_buffer = io.BytesIO()
+        square_image.save(image_buffer, format='PNG')
+        
+        # Prepare mask if provided
+        mask_png = None
+        if mask:
+            if mask.mode != 'RGBA':
+                mask = mask.convert('RGBA')
+            # Make mask same size as image
+            if mask.size != square_image.size:
+                mask = mask.resize(square_image.size, Image.Resampling.LANCZOS)
+            mask_buffer = io.BytesIO()
+            mask.save(mask_buffer, format='PNG')
+            mask_png = mask_buffer.getvalue()
+        
+        return {
+            "image_png": image_buffer.getvalue(),
+            "mask_png": mask_png,
+            "original_size": original_size,
+            "scaled_size": image.size,
+            "offset": offset
+        }
+    
+    def _request_dalle_edits(self, prepared: dict, prompt: str, n: int = 1) -> list:
+        """Issue a single DALL-E 2 edit request for n candidates and download the results.
+        
+        Makes no Streamlit calls so it is safe to run from worker threads.
+        """
+        edit_params = {
+            "model": "dall-e-2",
+            "image": io.BytesIO(prepared["image_png"]),
+            "prompt": prompt,
+            "n": n,
+            "size": "1024x1024"
+        }
+        if prepared["mask_png"]:
+            edit_params["mask"] = io.BytesIO(prepared["mask_png"])
+        
+        response = self.client.images.edit(**edit_params)
+        
+        edited_images = []
+        for item in response.data:
+            # Download edited image
+            image_response = requests.get(item.url)
+            if image_response.status_code != 200:
+                raise Exception(f"Failed to download edited image: HTTP {image_response.status_code}")
+            edited_images.append(Image.open(io.BytesIO(image_response.content), formats=_image_formats()))
+        return edited_images
+    
+    def _restore_dalle_edit_size(self, edited_image: Image.Image, prepared: dict) -> Image.Image:
+        """Crop DALL-E padding away and resize back to the original dimensions"""
+        original_size = prepared["original_size"]
+        if edited_image.size != original_size:
+            # Remove padding and resize to original size
+            offset = prepared["offset"]
+            scaled_width, scaled_height = prepared["scaled_size"]
+            edited_image = edited_image.crop((offset[0], offset[1], 
+                                              offset[0] + scaled_width, 
+                                              offset[1] + scaled_height))
+            edited_image = edited_image.resize(original_size, Image.Resampling.LANCZOS)
+        return edited_image
+    
     def edit_dalle_image(self, image: Image.Image, prompt: str, mask: Optional[Image.Image] = None) -> Optional[Image.Image]:
         """
         Edit an existing image using DALL-E's image editing capability
@@ -391,95 +838,134 @@ class AIImageGenerator:
             
             # Prepare image for DALL-E (must be PNG, RGBA, square, and < 4MB)
             st.info("🔄 Preparing image for editing...")
-            
-            # Convert to RGBA if not already
-            if image.mode != 'RGBA':
-                image = image.convert('RGBA')
-            
-            # DALL-E edit requires square images (1024x1024 max)
-            original_size = image.size
-            max_size = 1024
-            
-            # Make it square by padding
-            max_dim = max(image.size)
-            if max_dim > max_size:
-                # Scale down proportionally
-                scale = max_size / max_dim
-                new_width = int(image.size[0] * scale)
-                new_height = int(image.size[1] * scale)
-                image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            
-            # Create square canvas
-            square_size = max(image.size)
-            square_image = Image.new('RGBA', (square_size, square_size), (255, 255, 255, 0))
-            # Center the image
-            offset = ((square_size - image.size[0]) // 2, (square_size - image.size[1]) // 2)
-            square_image.paste(image, offset)
-            
-            # Save to bytes
-            image_bytes = io.BytesIO()
-            square_image.save(image_bytes, format='PNG')
-            image_bytes.seek(0)
-            
-            # Prepare mask if provided
-            mask_bytes = None
-            if mask:
-                if mask.mode != 'RGBA':
-                    mask = mask.convert('RGBA')
-                # Make mask same size as image
-                if mask.size != square_image.size:
-                    mask = mask.resize(square_image.size, Image.Resampling.LANCZOS)
-                mask_bytes = io.BytesIO()
-                mask.save(mask_bytes, format='PNG')
-                mask_bytes.seek(0)
+            prepared = self._prepare_dalle_edit_inputs(image, mask)
             
             st.info("🔄 Sending edit request to OpenAI DALL-E 2...")
-            
-            # Call DALL-E edit API
-            if mask_bytes:
-                response = self.client.images.edit(
-                    model="dall-e-2",
-                    image=image_bytes,
-                    mask=mask_bytes,
-                    prompt=prompt,
-                    n=1,
-                    size="1024x1024"
-                )
-            else:
-                response = self.client.images.edit(
-                    model="dall-e-2",
-                    image=image_bytes,
-                    prompt=prompt,
-                    n=1,
-                    size="1024x1024"
-                )
-            
-            st.success("✅ Received edited image from OpenAI")
-            image_url = response.data[0].url
-            
-            # Download edited image
-            image_response = requests.get(image_url)
-            if image_response.status_code != 200:
-                raise Exception(f"Failed to download edited image: HTTP {image_response.status_code}")
-            
-            edited_image = Image.open(io.BytesIO(image_response.content))
+            edited_image = self._request_dalle_edits(prepared, prompt, n=1)[0]
             st.success(f"✅ Edited image downloaded: {edited_image.size[0]}x{edited_image.size[1]}")
             
             # Crop back to original aspect ratio if it was padded
-            if edited_image.size != original_size:
-                # Remove padding and resize to original size
-                edited_image = edited_image.crop((offset[0], offset[1], 
-                                                  offset[0] + image.size[0], 
-                                                  offset[1] + image.size[1]))
-                edited_image = edited_image.resize(original_size, Image.Resampling.LANCZOS)
-            
-            return edited_image
+            return self._restore_dalle_edit_size(edited_image, prepared)
             
         except Exception as e:
             st.error(f"❌ DALL-E Edit Error: {str(e)}")
             st.error("💡 Make sure your image is in a supported format and try again.")
             return None
     
+    def edit_dalle_image_batch(self, image: Image.Image, prompts: list, n: int = 1,
+                               mask: Optional[Image.Image] = None, max_workers: int = 4) -> list:
+        """
+        Apply several edit prompts to the same image in one pass
+        
+        The DALL-E edit endpoint accepts a single prompt per request, so distinct prompts
+        are issued concurrently (bounded by max_workers) while each request asks for n
+        candidates via the API's `n` parameter. The source image is prepared and
+        PNG-encoded only once for all requests.
+        
+        Args:
+            image: The original image to edit (PIL Image)
+            prompts: List of edit prompts
+            n: Candidates to request per prompt (1-10)
+            mask: Optional mask image shared by all requests
+            max_workers: Maximum number of concurrent requests
+        
+        Returns:
+            List of (prompt, edited PIL Image) tuples for every candidate that succeeded
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        
+        if not hasattr(self, 'client') or not self.client:
+            st.error("❌ DALL-E API client not configured. Please check your OPENAI_API_KEY in the .env file.")
+            return []
+        
+        if not prompts:
+            return []
+        
+        if self.model_name == "DALL-E 3":
+            st.warning("⚠️ DALL-E 3 doesn't support image editing. Using DALL-E 2 for this operation.")
+        
+        n = max(1, min(int(n), 10))
+        
+        try:
+            prepared = self._prepare_dalle_edit_inputs(image, mask)
+        except Exception as e:
+            st.error(f"❌ DALL-E Edit Error: {str(e)}")
+            return []
+        
+        st.info(f"🔄 Sending {len(prompts)} edit request(s) to OpenAI DALL-E 2...")
+        
+        def run_edit(prompt):
+            try:
+                return prompt, self._request_dalle_edits(prepared, prompt, n=n), None
+            except Exception as e:
+                return prompt, [], e
+        
+        results = []
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(prompts)))) as executor:
+            for prompt, edited_images, error in executor.map(run_edit, prompts):
+                if error is not None:
+                    st.warning(f"⚠️ Edit failed for \"{prompt[:60]}...\": {str(error)}")
+                    continue
+                for edited_image in edited_images:
+                    results.append((prompt, self._restore_dalle_edit_size(edited_image, prepared)))
+        
+        st.success(f"✅ Received {len(results)} edited candidate(s) from OpenAI")
+        return results
+    
+    async def aedit_dalle_image(self, image: Image.Image, prompt: str, mask: Optional[Image.Image] = None,
+                                n: int = 1) -> list:
+        """
+        Async variant of edit_dalle_image that returns n candidates from a single request
+        
+        Uses the async OpenAI client and downloads all candidate images concurrently.
+        Makes no Streamlit calls; errors propagate to the caller.
+        
+        Returns:
+            List of edited PIL Images restored to the original size
+        """
+        import asyncio
+        import httpx
+        from openai import AsyncOpenAI
+        
+        if not hasattr(self, 'client') or not self.client:
+            raise RuntimeError("DALL-E API client not configured. Please check your OPENAI_API_KEY.")
+        
+        prepared = self._prepare_dalle_edit_inputs(image, mask)
+        edit_params = {
+            "model": "dall-e-2",
+            "image": io.BytesIO(prepared["image_png"]),
+            "prompt": prompt,
+            "n": max(1, min(int(n), 10)),
+            "size": "1024x1024"
+        }
+        if prepared["mask_png"]:
+            edit_params["mask"] = io.BytesIO(prepared["mask_png"])
+        
+        # Mirror the sync client's settings; a fresh client per call because each
+        # asyncio.run() gets its own event loop and httpx connections are loop-bound
+        async_client = AsyncOpenAI(
+            api_key=self.client.api_key,
+            organization=self.client.organization,
+            base_url=self.client.base_url,
+            timeout=self.client.timeout,
+            max_retries=self.client.max_retries
+        )
+        try:
+            response = await async_client.images.edit(**edit_params)
+        finally:
+            await async_client.close()
+        
+        async with httpx.AsyncClient(timeout=60) as http_client:
+            downloads = await asyncio.gather(*[http_client.get(item.url) for item in response.data])
+        
+        edited_images = []
+        for image_response in downloads:
+            if image_response.status_code != 200:
+                raise Exception(f"Failed to download edited image: HTTP {image_response.status_code}")
+            edited_image = Image.open(io.BytesIO(image_response.content), formats=_image_formats())
+            edited_images.append(self._restore_dalle_edit_size(edited_image, prepared))
+        return edited_images
+    
     def generate_stable_diffusion_image(self, prompt: str, size: Tuple[int, int]) -> Optional[Image.Image]:
         """Generate image using Stable Diffusion API (placeholder)"""
         st.info("🔧 Stable Diffusion integration in development")
@@ -837,12 +1323,12 @@ class AIImageGenerator:
                                             continue
                                         
                                         # Create PIL Image
-                                        image = Image.open(io.BytesIO(image_bytes))
+                                        image = Image.open(io.BytesIO(image_bytes), formats=_image_formats())
                                         
                                         # Resize if needed
                                         if image.size != size:
                                             st.info(f"🔄 Resizing from {image.size} to {size}")
-                                            image = image.resize(size, Image.Resampling.LANCZOS)
+                                            image = _resize_to_size(image, size)
                                         
                                         st.success(f"✅ Nano Banana image generated: {image.size[0]}x{image.size[1]}")
                                         return image
@@ -894,7 +1380,7 @@ class AIImageGenerator:
                                             raise ValueError("Image data too small to be valid")
                                         
                                         # Try to open as image
-                                        image = Image.open(io.BytesIO(image_bytes))
+                                        image = Image.open(io.BytesIO(image_bytes), formats=_image_formats())
                                         
                                     except Exception as decode_error:
                                         st.warning(f"⚠️ Standard decode failed: {str(decode_error)}")
@@ -903,11 +1389,11 @@ class AIImageGenerator:
                                         # Maybe the data is already bytes, not base64
                                         try:
                                             if isinstance(image_data, bytes):
-                                                image = Image.open(io.BytesIO(image_data))
+                                                image = Image.open(io.BytesIO(image_data), formats=_image_formats())
                                             else:
                                                 # Try without base64 decode
                                                 image_bytes = image_data.encode() if isinstance(image_data, str) else image_data
-                                                image = Image.open(io.BytesIO(image_bytes))
+                                                image = Image.open(io.BytesIO(image_bytes), formats=_image_formats())
                                         except Exception as alt_error:
                                             st.error(f"❌ Alternative processing failed: {str(alt_error)}")
                                             st.info("🔍 Debugging image data format...")
@@ -920,7 +1406,7 @@ class AIImageGenerator:
                                     # Resize to exact dimensions if needed
                                     if image.size != size:
                                         st.info(f"🔄 Resizing from {image.size} to {size}")
-                                        image = image.resize(size, Image.Resampling.LANCZOS)
+                                        image = _resize_to_size(image, size)
                                     
                                     return image
                                     
@@ -983,19 +1469,19 @@ class AIImageGenerator:
                                             try:
                                                 # Standard base64 decode
                                                 image_bytes = base64.b64decode(image_data)
-                                                image = Image.open(io.BytesIO(image_bytes))
+                                                image = Image.open(io.BytesIO(image_bytes), formats=_image_formats())
                                             except Exception:
                                                 # Try direct bytes
                                                 if isinstance(image_data, bytes):
-                                                    image = Image.open(io.BytesIO(image_data))
+                                                    image = Image.open(io.BytesIO(image_data), formats=_image_formats())
                                                 else:
                                                     # Try as raw string
                                                     image_bytes = image_data.encode() if isinstance(image_data, str) else image_data
-                                                    image = Image.open(io.BytesIO(image_bytes))
+                                                    image = Image.open(io.BytesIO(image_bytes), formats=_image_formats())
                                             
                                             # Resize if needed
                                             if image.size != size:
-                                                image = image.resize(size, Image.Resampling.LANCZOS)
+                                                image = _resize_to_size(image, size)
                                             
                                             st.success(f"✅ {model_name} generated {image.size[0]}x{image.size[1]} image")
                                             return image
@@ -1161,19 +1647,26 @@ class NanoBananaProFeatures:
     
     @staticmethod
     def generate_with_references(generator, prompt, size=(1024, 1024), reference_images=None, 
-                               use_search_grounding=False, text_rendering_mode=False):
-        """Generate with Nano Banana Pro advanced features"""
+                               use_search_grounding=False, text_rendering_mode=False, use_cache=True):
+        """Generate with Nano Banana Pro advanced features
+        
+        Results are cached on disk under assets/.nbp_cache keyed by the enhanced prompt,
+        size, feature flags and reference image contents. Pass use_cache=False to force
+        a fresh generation.
+        """
         try:
-            if not hasattr(generator, 'google_api_key'):
+            if not getattr(generator, 'google_api_key', None):
                 st.warning("⚠️ Google API not configured for Nano Banana Pro features")
                 return None
             
-            import google.generativeai as genai
-            genai.configure(api_key=generator.google_api_key)
+            if not _GENAI_AVAILABLE:
+                st.error("❌ Google Generative AI library not installed. Install with: pip install google-generativeai")
+                return None
             
-            # Use Nano Banana Pro model
-            model_name = 'gemini-3-pro-image-preview'
-            model = genai.GenerativeModel(model_name)
+            # SDK configuration is global, so set this generator's key before every use
+            genai.configure(api_key=generator.google_api_key)
+            model_name = NBP_MODEL_NAME
+            model = generator.nbp_model
             
             # Enhanced prompt for Nano Banana Pro capabilities
             enhanced_prompt = NanoBananaProFeatures._build_enhanced_prompt(
@@ -1182,67 +1675,64 @@ class NanoBananaProFeatures:
             
             st.info(f"🚀 Nano Banana Pro: Search={use_search_grounding}, Text={text_rendering_mode}")
             
+            # Download URL references concurrently up front so they hash and decode like local files
+            if reference_images and any(_is_url(ref_img) for ref_img in reference_images[:14]):
+                reference_images, url_errors = _resolve_url_references(reference_images[:14])
+                for url, url_error in url_errors:
+                    st.warning(f"⚠️ Could not download reference image {url[:80]}: {url_error}")
+            
+            # Check the on-disk cache before doing any reference processing or API work
+            cache_key = None
+            if use_cache:
+                try:
+                    cache_key = _nbp_cache_key(enhanced_prompt, size, use_search_grounding,
+                                               text_rendering_mode, reference_images)
+                except Exception:
+                    cache_key = None
+                if cache_key:
+                    cached_image = _load_cached_nbp_image(cache_key)
+                    if cached_image is not None:
+                        st.success("♻️ Nano Banana Pro: reusing cached result for identical prompt and references")
+                        return cached_image
+            
             # Prepare input for multi-modal generation
             generation_input = [enhanced_prompt]
             
             # Add reference images (up to 14 for Nano Banana Pro)
+            # Per-reference messages are collected and rendered once after the loop
+            # instead of sending one Streamlit delta per message.
             successful_references = 0
             if reference_images:
+                reference_placeholder = st.empty()
+                log_lines = []
+                failed_references = 0
+                reference_sizes = []
                 for i, ref_img in enumerate(reference_images[:14]):
                     try:
-                        # Add debug info
-                        st.write(f"🔍 Processing reference image {i+1}: {type(ref_img)}")
-                        
-                        # Handle different image input types
-                        if hasattr(ref_img, 'read') and hasattr(ref_img, 'seek'):
-                            # Streamlit UploadedFile - convert to PIL Image
-                            try:
-                                ref_img.seek(0)
-                                pil_image = Image.open(ref_img)
-                                generation_input.append(pil_image)
-                                successful_references += 1
-                                st.info(f"📎 Reference image {i+1}/14 added (UploadedFile converted)")
-                            except Exception as upload_error:
-                                st.warning(f"⚠️ Failed to process UploadedFile {i+1}: {upload_error}")
-                                continue
-                        elif isinstance(ref_img, Image.Image):
-                            # Already PIL Image
-                            generation_input.append(ref_img)
-                            successful_references += 1
-                            st.info(f"📎 Reference image {i+1}/14 added (PIL Image)")
-                        elif hasattr(ref_img, 'getvalue'):
-                            # BytesIO object - get the bytes directly
-                            try:
-                                image_bytes = ref_img.getvalue()
-                                if isinstance(image_bytes, bytes) and len(image_bytes) > 0:
-                                    image_buffer = io.BytesIO(image_bytes)
-                                    pil_image = Image.open(image_buffer)
-                                    generation_input.append(pil_image)
-                                    successful_references += 1
-                                    st.info(f"📎 Reference image {i+1}/14 added (BytesIO converted)")
-                                else:
-                                    st.warning(f"⚠️ Reference image {i+1}: Empty or invalid BytesIO data")
-                            except Exception as convert_error:
-                                st.warning(f"⚠️ Failed to convert BytesIO reference image {i+1}: {convert_error}")
-                        else:
-                            # Try direct PIL Image.open with better error handling
-                            try:
-                                # Check if it's a file-like object or path
-                                if hasattr(ref_img, '__fspath__') or isinstance(ref_img, (str, bytes)):
-                                    pil_image = Image.open(ref_img)
-                                    generation_input.append(pil_image)
-                                    successful_references += 1
-                                    st.info(f"📎 Reference image {i+1}/14 added (Direct conversion)")
-                                else:
-                                    st.warning(f"⚠️ Reference image {i+1}: Unsupported object type {type(ref_img)}")
-                            except Exception as convert_error:
-                                st.warning(f"⚠️ Failed to convert reference image {i+1}: {convert_error}")
-                                st.error(f"🔍 Debug: Object type={type(ref_img)}, hasattr(read)={hasattr(ref_img, 'read')}")
-                            except Exception as convert_error:
-                                st.warning(f"⚠️ Failed to convert reference image {i+1}: {convert_error}")
+                        part, part_size, source = _prepare_reference_part(ref_img)
+                        generation_input.append(part)
+                        reference_sizes.append(part_size)
+                        successful_references += 1
+                        log_lines.append(f"📎 Reference image {i+1}/14 added ({source})")
                     except Exception as img_error:
-                        st.warning(f"⚠️ Error processing reference image {i+1}: {img_error}")
-                        continue
+                        failed_references += 1
+                        log_lines.append(f"⚠️ Failed to process reference image {i+1} ({type(ref_img).__name__}): {img_error}")
+                
+                # Validate sizes client-side instead of letting the API reject oversized refs
+                reference_parts, downscaled = _downscale_oversized_references(generation_input[1:], reference_sizes)
+                if downscaled:
+                    generation_input[1:] = reference_parts
+                    log_lines.append(f"📐 Downscaled {downscaled} oversized reference image(s) to fit {NBP_MAX_REFERENCE_SIDE}px")
+                
+                # Single summary update for the whole batch
+                summary = f"📎 {successful_references}/{min(len(reference_images), 14)} reference images processed"
+                if failed_references:
+                    reference_placeholder.warning(f"{summary} ({failed_references} failed)")
+                else:
+                    reference_placeholder.success(summary)
+                if st.session_state.get("debug_refs"):
+                    with st.expander("🔍 Reference Image Processing Log", expanded=False):
+                        st.text("\n".join(log_lines))
                 
                 if successful_references == 0 and reference_images:
                     st.warning("⚠️ No reference images could be processed. Continuing without references.")
@@ -1254,40 +1744,42 @@ class NanoBananaProFeatures:
             )
             
             # === CAPTURE ALL API PARAMETERS FOR NANO BANANA PRO ===
-            api_call_details = {
-                "api_provider": "Google Generative AI (Nano Banana Pro)",
-                "model_name": model_name,
-                "method": "generate_content",
-                "generation_config": {
-                    "candidate_count": 1,
-                    "temperature": 0.7
-                },
-                "input_components": {
-                    "text_prompt": enhanced_prompt,
-                    "reference_images_count": successful_references,
-                    "total_inputs": len(generation_input)
-                },
-                "advanced_features": {
-                    "search_grounding": use_search_grounding,
-                    "text_rendering_mode": text_rendering_mode
-                },
-                "prompt_details": {
-                    "base_prompt": prompt,
-                    "enhanced_prompt": enhanced_prompt,
-                    "prompt_length": len(enhanced_prompt),
-                    "prompt_word_count": len(enhanced_prompt.split())
-                },
-                "target_size": {"width": size[0], "height": size[1]}
-            }
-            
-            with st.expander("📡 Nano Banana Pro API Call Details", expanded=False):
-                st.json(api_call_details)
-                st.markdown("### Base Prompt (from app)")
-                st.text_area("Original prompt:", prompt, height=200, key="nbp_base")
-                st.markdown("### Enhanced Prompt (with Pro features)")
-                st.text_area("Full prompt sent to API:", enhanced_prompt, height=400, key="nbp_enhanced")
-                if reference_images:
-                    st.markdown(f"### Reference Images: {successful_references} successfully processed")
+            # Only built and rendered in debug mode - the payload can be tens of KB per call
+            if st.session_state.get("nbp_debug", False):
+                api_call_details = {
+                    "api_provider": "Google Generative AI (Nano Banana Pro)",
+                    "model_name": model_name,
+                    "method": "generate_content",
+                    "generation_config": {
+                        "candidate_count": 1,
+                        "temperature": 0.7
+                    },
+                    "input_components": {
+                        "text_prompt": enhanced_prompt,
+                        "reference_images_count": successful_references,
+                        "total_inputs": len(generation_input)
+                    },
+                    "advanced_features": {
+                        "search_grounding": use_search_grounding,
+                        "text_rendering_mode": text_rendering_mode
+                    },
+                    "prompt_details": {
+                        "base_prompt": prompt,
+                        "enhanced_prompt": enhanced_prompt,
+                        "prompt_length": len(enhanced_prompt),
+                        "prompt_word_count": len(enhanced_prompt.split())
+                    },
+                    "target_size": {"width": size[0], "height": size[1]}
+                }
+                
+                with st.expander("📡 Nano Banana Pro API Call Details", expanded=False):
+                    st.json(api_call_details)
+                    st.markdown("### Base Prompt (from app)")
+                    st.text_area("Original prompt:", prompt, height=200, key="nbp_base")
+                    st.markdown("### Enhanced Prompt (with Pro features)")
+                    st.text_area("Full prompt sent to API:", enhanced_prompt, height=400, key="nbp_enhanced")
+                    if reference_images:
+                        st.markdown(f"### Reference Images: {successful_references} successfully processed")
             
             with st.status("🎨 Generating with Nano Banana Pro...", expanded=True) as status:
                 st.write("🔍 Enhanced prompt prepared")
@@ -1297,54 +1789,55 @@ class NanoBananaProFeatures:
                 st.write(f"✍️ Text rendering: {'Enabled' if text_rendering_mode else 'Disabled'}")
                 
                 try:
-                    response = model.generate_content(
-                        generation_input,
-                        generation_config=generation_config
-                    )
+                    with _NBP_SEM:
+                        _get_nbp_bucket().acquire()
+                        response = model.generate_content(
+                            generation_input,
+                            generation_config=generation_config
+                        )
                     st.write("✅ Content generation completed")
                 except Exception as gen_error:
                     st.error(f"❌ Generation failed: {gen_error}")
                     status.update(label="❌ Generation error", state="error")
                     return None
                 
-                # Process response
-                if hasattr(response, 'candidates') and response.candidates:
-                    candidate = response.candidates[0]
-                    if hasattr(candidate, 'content') and candidate.content.parts:
-                        for part in candidate.content.parts:
-                            if hasattr(part, 'inline_data') and part.inline_data:
-                                try:
-                                    import base64
-                                    # Get the image data properly
-                                    if hasattr(part.inline_data, 'data'):
-                                        image_data = part.inline_data.data
-                                        
-                                        # Handle different data formats
-                                        if isinstance(image_data, str):
-                                            # Base64 string - decode it
-                                            decoded_data = base64.b64decode(image_data)
-                                        elif isinstance(image_data, bytes):
-                                            # Already bytes
-                                            decoded_data = image_data
-                                        else:
-                                            # Try to get bytes from object
-                                            decoded_data = bytes(image_data)
-                                        
-                                        # Create BytesIO and open image safely
-                                        image_buffer = io.BytesIO(decoded_data)
-                                        image = Image.open(image_buffer)
-                                        
-                                        # Resize if needed
-                                        if image.size != size:
-                                            image = image.resize(size, Image.Resampling.LANCZOS)
-                                        
-                                        status.update(label="✅ Nano Banana Pro complete!", state="complete")
-                                        return image
-                                except Exception as e:
-                                    st.error(f"❌ Error processing image: {e}")
-                                    st.error(f"🔍 Debug info - Data type: {type(part.inline_data.data)}")
-                                    if hasattr(part.inline_data, 'data'):
-                                        st.error(f"🔍 Debug info - Data length: {len(part.inline_data.data) if hasattr(part.inline_data.data, '__len__') else 'Unknown'}")
+                # Process response - image responses normally carry the image in parts[0],
+                # so check that directly and only scan the remaining parts as a fallback
+                candidates = getattr(response, 'candidates', None)
+                content = getattr(candidates[0], 'content', None) if candidates else None
+                parts = content.parts if content is not None else None
+                inline = getattr(parts[0], 'inline_data', None) if parts else None
+                if not inline and parts:
+                    inline = next((p.inline_data for p in parts[1:] if getattr(p, 'inline_data', None)), None)
+                
+                image_data = getattr(inline, 'data', None) if inline else None
+                if image_data:
+                    try:
+                        # Raw bytes are used as-is; base64 strings are decoded straight
+                        # into the buffer without an intermediate copy
+                        if isinstance(image_data, (bytes, bytearray)):
+                            raw = image_data
+                        elif isinstance(image_data, str):
+                            raw = _b64_stream_decode(image_data)
+                        else:
+                            raise TypeError(f"Unsupported inline_data payload type: {type(image_data).__name__}")
+                        
+                        # Restrict format probing and force decode while the buffer is alive
+                        image = Image.open(io.BytesIO(raw), formats=_image_formats())
+                        image.load()
+                        
+                        # Resize if needed (no-op when the model already returned the target size)
+                        image = _resize_to_size(image, size)
+                        
+                        if cache_key:
+                            _store_cached_nbp_image(cache_key, image)
+                        
+                        status.update(label="✅ Nano Banana Pro complete!", state="complete")
+                        return image
+                    except Exception as e:
+                        st.error(f"❌ Error processing image: {e}")
+                        st.error(f"🔍 Debug info - Data type: {type(image_data)}")
+                        st.error(f"🔍 Debug info - Data length: {len(image_data) if hasattr(image_data, '__len__') else 'Unknown'}")
                 
                 status.update(label="❌ No image generated", state="error")
             
@@ -1357,11 +1850,9 @@ class NanoBananaProFeatures:
     @staticmethod
     def _build_enhanced_prompt(base_prompt, use_search_grounding=False, text_rendering_mode=False):
         """Build enhanced prompt with Nano Banana Pro capabilities"""
-        return PromptBuilder.build_nano_banana_pro_prompt(
-            base_prompt, use_search_grounding, text_rendering_mode
-        )
+        return _cached_nbp_prompt(base_prompt, bool(use_search_grounding), bool(text_rendering_mode))
     
     @staticmethod
     def detect_advanced_features(prompt):
         """Auto-detect if advanced features should be enabled"""
-        return PromptBuilder.detect_advanced_features(prompt)
\ No newline at end of file
+        return _cached_detect_features(prompt)
\ No newline at end of file
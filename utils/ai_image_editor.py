@@ -4,6 +4,9 @@ Allows users to modify generated images using natural language prompts
 """
 
 import streamlit as st
+import asyncio
+import functools
+from types import MappingProxyType
 from PIL import Image, ImageDraw
 import io
 import os
@@ -11,6 +14,87 @@ from datetime import datetime
 from typing import Optional
 from .ai_generator import AIImageGenerator
 
+# Quick enhancement presets (label -> edit prompt), frozen at import
+EDIT_PRESETS = MappingProxyType({
+    "🎨 Change Text Color": "Change the text color to black with white outline for better readability",
+    "🌈 Enhance Colors": "Make the colors more vibrant and eye-catching, increase saturation and contrast",
+    "✨ Professional Polish": "Add professional polish with subtle shadows, lighting effects, and refined typography",
+    "🔆 Brighten Image": "Brighten the overall image, increase exposure and make it more vibrant",
+    "🎭 Change Background": "Change the background to a gradient from blue to purple, keep all other elements the same",
+    "📐 Reposition Elements": "Move the main text to the top center and the button to the bottom, keep everything else the same"
+})
+EDIT_PRESET_LABELS = tuple(EDIT_PRESETS)
+
+@functools.lru_cache(maxsize=16)
+def _enhancement_instructions(preserve_composition, preserve_style, preserve_colors, high_quality):
+    """Build enhancement instructions and their joined forms once per checkbox combination
+    
+    Returns:
+        (instructions tuple, display summary, prompt suffix)
+    """
+    instructions = []
+    if preserve_composition:
+        instructions.append("maintain the same composition and layout")
+    if preserve_style:
+        instructions.append("keep the same artistic style")
+    if preserve_colors:
+        instructions.append("preserve the color scheme where not explicitly changed")
+    if high_quality:
+        instructions.append("high quality, professional finish")
+    
+    instructions = tuple(instructions)
+    summary = ", ".join(instructions)
+    suffix = f". Please {', and '.join(instructions)}." if instructions else ""
+    return instructions, summary, suffix
+
+def _build_final_prompt(modification_prompt, prompt_suffix):
+    """Append the precomputed enhancement suffix to an edit prompt"""
+    return f"{modification_prompt}{prompt_suffix}"
+
+def _save_edited_image(edited_image):
+    """Save an accepted AI edit to assets/generated_ads"""
+    try:
+        output_dir = "assets/generated_ads"
+        os.makedirs(output_dir, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        client_name = st.session_state.generation_params.get("client_name", "ad").replace(" ", "_")
+        filename = f"ai_edited_{client_name}_{timestamp}.png"
+        filepath = os.path.join(output_dir, filename)
+        # Iteration artifact: fast zlib level keeps the UI responsive (downloads keep default compression)
+        edited_image.save(filepath, "PNG", compress_level=1, optimize=False)
+        st.success(f"✅ Edited image saved to: {filepath}")
+    except Exception as save_error:
+        st.warning(f"Image updated but couldn't save to file: {str(save_error)}")
+
+def _show_edit_candidates(candidates):
+    """Show AI edit candidates next to the original and let the user keep or iterate on one"""
+    st.markdown("#### 🔄 Before & After Comparison")
+    columns = st.columns(min(len(candidates), 3) + 1)
+    
+    with columns[0]:
+        st.markdown("**Original:**")
+        st.image(st.session_state.generated_ad, use_column_width=True)
+    
+    for i, (label, edited_image) in enumerate(candidates):
+        with columns[1 + i % (len(columns) - 1)]:
+            st.markdown(f"**{label}:**")
+            st.image(edited_image, use_column_width=True)
+            if st.button("✅ Keep This Version", key=f"keep_ai_edit_candidate_{i}", type="primary", width='stretch'):
+                st.session_state.generated_ad = edited_image
+                _save_edited_image(edited_image)
+                del st.session_state.ai_edit_candidates
+                st.info("💡 Close the editor to see your updated advertisement")
+                st.balloons()
+            if st.button("🔄 Try Another Edit", key=f"iterate_ai_edit_candidate_{i}", width='stretch'):
+                st.session_state.generated_ad = edited_image
+                del st.session_state.ai_edit_candidates
+                st.rerun()
+    
+    if st.button("❌ Discard Changes", key="discard_ai_edit_candidates"):
+        del st.session_state.ai_edit_candidates
+        st.info("Changes discarded. Original image preserved.")
+        st.rerun()
+
 def show_ai_image_editor():
     """Display AI-powered image editing interface for DALL-E models"""
     
@@ -43,56 +127,35 @@ def show_ai_image_editor():
     
     # Enhancement presets
     st.markdown("#### 🎯 Quick Enhancements")
-    st.markdown("Choose a preset or write your own custom modification:")
-    
-    col1, col2, col3 = st.columns(3)
+    st.markdown("Pick a preset as a starting point, queue several presets to apply in one batch, or write your own custom modification:")
     
-    with col1:
-        if st.button("🎨 Change Text Color", width='stretch'):
-            st.session_state.edit_preset = "Change the text color to black with white outline for better readability"
+    # One button per preset to use it as the starting point for a custom edit
+    preset_columns = st.columns(3)
+    for i, label in enumerate(EDIT_PRESET_LABELS):
+        if preset_columns[i % 3].button(label, key=f"ai_edit_preset_{i}", width='stretch'):
+            # Seed the custom prompt widget's state before it is instantiated below
+            st.session_state.ai_edit_prompt = EDIT_PRESETS[label]
     
-    with col2:
-        if st.button("🌈 Enhance Colors", width='stretch'):
-            st.session_state.edit_preset = "Make the colors more vibrant and eye-catching, increase saturation and contrast"
-    
-    with col3:
-        if st.button("✨ Professional Polish", width='stretch'):
-            st.session_state.edit_preset = "Add professional polish with subtle shadows, lighting effects, and refined typography"
-    
-    col4, col5, col6 = st.columns(3)
-    
-    with col4:
-        if st.button("🔆 Brighten Image", width='stretch'):
-            st.session_state.edit_preset = "Brighten the overall image, increase exposure and make it more vibrant"
-    
-    with col5:
-        if st.button("🎭 Change Background", width='stretch'):
-            st.session_state.edit_preset = "Change the background to a gradient from blue to purple, keep all other elements the same"
-    
-    with col6:
-        if st.button("📐 Reposition Elements", width='stretch'):
-            st.session_state.edit_preset = "Move the main text to the top center and the button to the bottom, keep everything else the same"
+    selected_presets = st.multiselect(
+        "Batch preset edits",
+        options=EDIT_PRESET_LABELS,
+        key="ai_edit_selected_presets",
+        help="Each selected preset produces its own edited candidate; all are requested together."
+    )
     
     st.markdown("---")
     
     # Custom modification prompt
     st.markdown("#### ✏️ Custom Modification")
     
-    # Use preset if selected, otherwise use custom
-    default_prompt = st.session_state.get('edit_preset', '')
-    
     modification_prompt = st.text_area(
         "Describe the changes you want to make:",
-        value=default_prompt,
+        key="ai_edit_prompt",
         height=100,
         placeholder="Example: Change the text color to black, make the background white instead of blue, move the logo to the top right corner",
         help="Be specific about what you want to change. DALL-E will modify only the parts you mention."
     )
     
-    # Clear preset after use
-    if 'edit_preset' in st.session_state:
-        del st.session_state.edit_preset
-    
     # Advanced options
     with st.expander("⚙️ Advanced Options"):
         st.markdown("**Enhancement Settings:**")
@@ -125,38 +188,64 @@ def show_ai_image_editor():
                 help="Use best quality settings for the edited image"
             )
         
-        # Build enhancement instructions
-        enhancement_instructions = []
-        if preserve_composition:
-            enhancement_instructions.append("maintain the same composition and layout")
-        if preserve_style:
-            enhancement_instructions.append("keep the same artistic style")
-        if preserve_colors:
-            enhancement_instructions.append("preserve the color scheme where not explicitly changed")
-        if high_quality:
-            enhancement_instructions.append("high quality, professional finish")
+        candidate_count = st.select_slider(
+            "Candidates per edit",
+            options=[1, 2, 3, 4],
+            value=1,
+            help="Request several variations in one API call and pick the best one (each candidate is billed as a separate image)"
+        )
+        
+        # Build enhancement instructions (memoized per checkbox combination)
+        enhancement_instructions, enhancement_summary, enhancement_suffix = _enhancement_instructions(
+            preserve_composition, preserve_style, preserve_colors, high_quality
+        )
         
         if enhancement_instructions:
-            st.info(f"🎯 Active enhancements: {', '.join(enhancement_instructions)}")
+            st.info(f"🎯 Active enhancements: {enhancement_summary}")
     
     st.markdown("---")
     
-    # Edit button
-    col1, col2, col3 = st.columns([2, 1, 2])
+    # Edit buttons
+    col1, col2, col3, col4 = st.columns([1, 1, 1, 1])
     with col2:
         edit_button = st.button("✨ Apply AI Edit", type="primary", width='stretch')
+    with col3:
+        preset_button = st.button(
+            f"🎯 Apply {len(selected_presets)} Preset(s)",
+            width='stretch',
+            disabled=not selected_presets
+        )
+    
+    if preset_button and selected_presets:
+        # One batched round of requests instead of one serial edit per preset
+        final_prompts = [
+            _build_final_prompt(EDIT_PRESETS[label], enhancement_suffix)
+            for label in selected_presets
+        ]
+        with st.spinner(f"✨ AI is applying {len(final_prompts)} preset edit(s)... This may take 10-20 seconds..."):
+            try:
+                generator = AIImageGenerator(model_name)
+                candidates = generator.edit_dalle_image_batch(
+                    image=st.session_state.generated_ad,
+                    prompts=final_prompts,
+                    n=1
+                )
+                labels = dict(zip(final_prompts, selected_presets))
+                st.session_state.ai_edit_candidates = [
+                    (labels.get(prompt, prompt), edited) for prompt, edited in candidates
+                ]
+                if not candidates:
+                    st.error("❌ Failed to edit image. Please try different presets or check your API key.")
+            except Exception as e:
+                st.error(f"❌ Error during AI editing: {str(e)}")
     
     if edit_button:
         if not modification_prompt.strip():
             st.error("❌ Please describe the changes you want to make.")
             return
         
-        # Build final prompt
-        final_prompt = modification_prompt.strip()
-        
-        # Add enhancement instructions
-        if enhancement_instructions:
-            final_prompt += f". Please {', and '.join(enhancement_instructions)}."
+        # Build final prompt with enhancement instructions
+        final_prompt = _build_final_prompt(modification_prompt.strip(), enhancement_suffix)
         
         st.info(f"🔄 AI Edit Prompt: {final_prompt}")
         
@@ -166,66 +255,19 @@ def show_ai_image_editor():
                 # Initialize AI generator with current model
                 generator = AIImageGenerator(model_name)
                 
-                # Edit the image
-                edited_image = generator.edit_dalle_image(
+                # Request all candidates in one async round-trip (no mask = edit entire image)
+                edited_images = asyncio.run(generator.aedit_dalle_image(
                     image=st.session_state.generated_ad,
                     prompt=final_prompt,
-                    mask=None  # No mask = edit entire image intelligently
-                )
+                    mask=None,
+                    n=candidate_count
+                ))
                 
-                if edited_image:
-                    # Show comparison
-                    st.success("✅ Image edited successfully!")
-                    
-                    st.markdown("#### 🔄 Before & After Comparison")
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        st.markdown("**Original:**")
-                        st.image(st.session_state.generated_ad, use_column_width=True)
-                    
-                    with col2:
-                        st.markdown("**AI Edited:**")
-                        st.image(edited_image, use_column_width=True)
-                    
-                    # Store edited image temporarily
-                    st.session_state.ai_edited_image = edited_image
-                    
-                    # Apply button
-                    st.markdown("---")
-                    col1, col2, col3 = st.columns([1, 1, 1])
-                    
-                    with col1:
-                        if st.button("✅ Keep Edited Version", type="primary", width='stretch'):
-                            st.session_state.generated_ad = edited_image
-                            
-                            # Save to file
-                            try:
-                                output_dir = "assets/generated_ads"
-                                os.makedirs(output_dir, exist_ok=True)
-                                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                                client_name = st.session_state.generation_params.get("client_name", "ad").replace(" ", "_")
-                                filename = f"ai_edited_{client_name}_{timestamp}.png"
-                                filepath = os.path.join(output_dir, filename)
-                                edited_image.save(filepath, "PNG")
-                                st.success(f"✅ Edited image saved to: {filepath}")
-                            except Exception as save_error:
-                                st.warning(f"Image updated but couldn't save to file: {str(save_error)}")
-                            
-                            st.info("💡 Close the editor to see your updated advertisement")
-                            st.balloons()
-                    
-                    with col2:
-                        if st.button("🔄 Try Another Edit", width='stretch'):
-                            st.session_state.generated_ad = edited_image
-                            st.rerun()
-                    
-                    with col3:
-                        if st.button("❌ Discard Changes", width='stretch'):
-                            if 'ai_edited_image' in st.session_state:
-                                del st.session_state.ai_edited_image
-                            st.info("Changes discarded. Original image preserved.")
-                            st.rerun()
+                if edited_images:
+                    st.success(f"✅ Image edited successfully! {len(edited_images)} candidate(s) ready.")
+                    st.session_state.ai_edit_candidates = [
+                        (f"AI Edited #{i+1}", edited) for i, edited in enumerate(edited_images)
+                    ]
                 else:
                     st.error("❌ Failed to edit image. Please try a different prompt or check your API key.")
                     
@@ -233,6 +275,9 @@ def show_ai_image_editor():
                 st.error(f"❌ Error during AI editing: {str(e)}")
                 st.info("💡 Try simplifying your edit prompt or check your OpenAI API key configuration.")
     
+    if st.session_state.get('ai_edit_candidates'):
+        _show_edit_candidates(st.session_state.ai_edit_candidates)
+    
     # Tips section
     st.markdown("---")
     with st.expander("💡 Tips for Best Results"):
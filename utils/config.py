@@ -1,64 +1,100 @@
-from typing import Dict, Tuple, List
-import json
+from typing import Dict, Tuple, Mapping, Optional
+from types import MappingProxyType
+import functools
 import os
 
-class EnvironmentManager:
-    """Manages environment variables with support for both .env files and Streamlit secrets"""
+# Resolve streamlit once at import time; config is also used outside the app
+try:
+    import streamlit as _ST
+except ImportError:
+    _ST = None
+_HAS_SECRETS = _ST is not None and hasattr(_ST, 'secrets')
+
+# orjson is optional; preferences fall back to the stdlib json module
+try:
+    import orjson as _orjson
+except ImportError:
+    _orjson = None
+
+# Set once assets/ has been created so repeated saves skip the makedirs syscall
+_ASSETS_DIR_READY = False
+
+# Parsed preference files keyed by path, as (mtime_ns, preferences)
+_PREFS_CACHE: Dict[str, Tuple[int, Dict]] = {}
+
+# Resolved config values keyed by name; misses are not cached so a later
+# load_dotenv() or secrets change is still picked up
+_CONFIG_CACHE: Dict[str, str] = {}
+
+def get_config_value(key: str, default: str = None) -> str:
+    """
+    Get configuration value from either Streamlit secrets or environment variables
+    Priority: Streamlit secrets > Environment variables > Default
     
-    @staticmethod
-    def get_config_value(key: str, default: str = None) -> str:
-        """
-        Get configuration value from either Streamlit secrets or environment variables
-        Priority: Streamlit secrets > Environment variables > Default
-        """
+    Found values are memoized per key; call clear_cache() after changing
+    secrets or environment variables at runtime. Missing keys are looked up again.
+    """
+    if key in _CONFIG_CACHE:
+        return _CONFIG_CACHE[key]
+    
+    value = None
+    if _HAS_SECRETS:
         try:
             # Try Streamlit secrets first (for deployed apps)
-            import streamlit as st
-            if hasattr(st, 'secrets'):
-                secrets_value = st.secrets.get(key)
-                if secrets_value is not None:
-                    return secrets_value
-        except ImportError:
-            # Streamlit not available, continue to env vars
-            pass
+            value = _ST.secrets.get(key)
         except Exception:
             # Secrets not configured or error accessing them
             pass
-        
+    
+    if value is None:
         # Fall back to environment variables (for local development)
-        value = os.getenv(key, default)
-        return value
+        value = os.getenv(key)
     
-    @staticmethod
-    def is_streamlit_deployment() -> bool:
-        """Check if running in Streamlit Cloud/deployment environment"""
-        try:
-            import streamlit as st
-            # Check if secrets are available AND have content
-            # Empty secrets means local dev, not cloud deployment
-            if hasattr(st, 'secrets') and st.secrets is not None:
-                # Try to access secrets - if they have keys, we're in cloud
-                try:
-                    # If secrets has any keys, we're likely in Streamlit Cloud
-                    return len(st.secrets) > 0
-                except:
-                    return False
-            return False
-        except ImportError:
-            return False
-        except Exception:
-            return False
+    if value is None:
+        return default
+    _CONFIG_CACHE[key] = value
+    return value
+
+@functools.lru_cache(maxsize=1)
+def is_streamlit_deployment() -> bool:
+    """Check if running in Streamlit Cloud/deployment environment (detected once per process)"""
+    if not _HAS_SECRETS:
+        return False
+    try:
+        # Check if secrets are available AND have content
+        # Empty secrets means local dev, not cloud deployment
+        if _ST.secrets is not None:
+            # If secrets has any keys, we're likely in Streamlit Cloud
+            return len(_ST.secrets) > 0
+        return False
+    except Exception:
+        return False
+
+def get_all_api_keys() -> Mapping[str, str]:
+    """Get all API keys from the environment (read-only; each key is memoized by get_config_value)"""
+    keys = {
+        'OPENAI_API_KEY': get_config_value('OPENAI_API_KEY'),
+        'GOOGLE_API_KEY': get_config_value('GOOGLE_API_KEY'),
+        'NANO_BANANA_API_KEY': get_config_value('NANO_BANANA_API_KEY')
+    }
+    # Filter out None values
+    return MappingProxyType({k: v for k, v in keys.items() if v is not None})
+
+def clear_cache() -> None:
+    """Forget memoized config values and deployment detection so they are re-read"""
+    _CONFIG_CACHE.clear()
+    is_streamlit_deployment.cache_clear()
+
+class EnvironmentManager:
+    """Manages environment variables with support for both .env files and Streamlit secrets
     
-    @staticmethod
-    def get_all_api_keys() -> Dict[str, str]:
-        """Get all API keys from the environment"""
-        keys = {
-            'OPENAI_API_KEY': EnvironmentManager.get_config_value('OPENAI_API_KEY'),
-            'GOOGLE_API_KEY': EnvironmentManager.get_config_value('GOOGLE_API_KEY'),
-            'NANO_BANANA_API_KEY': EnvironmentManager.get_config_value('NANO_BANANA_API_KEY')
-        }
-        # Filter out None values
-        return {k: v for k, v in keys.items() if v is not None}
+    The lookups are module-level functions; these aliases keep the class-based API working.
+    """
+    
+    get_config_value = staticmethod(get_config_value)
+    is_streamlit_deployment = staticmethod(is_streamlit_deployment)
+    get_all_api_keys = staticmethod(get_all_api_keys)
+    clear_cache = staticmethod(clear_cache)
     
     @staticmethod
     def get_api_keys_explicit() -> Dict[str, str]:
@@ -68,10 +104,9 @@ class EnvironmentManager:
         """
         try:
             # Try to get from Streamlit secrets first, then fall back to environment variables
-            import streamlit as st
-            openai_key = st.secrets.get("OPENAI_API_KEY") or os.getenv("OPENAI_API_KEY")
-            google_key = st.secrets.get("GOOGLE_API_KEY") or os.getenv("GOOGLE_API_KEY")
-            nano_banana_key = st.secrets.get("NANO_BANANA_API_KEY") or os.getenv("NANO_BANANA_API_KEY")
+            openai_key = _ST.secrets.get("OPENAI_API_KEY") or os.getenv("OPENAI_API_KEY")
+            google_key = _ST.secrets.get("GOOGLE_API_KEY") or os.getenv("GOOGLE_API_KEY")
+            nano_banana_key = _ST.secrets.get("NANO_BANANA_API_KEY") or os.getenv("NANO_BANANA_API_KEY")
         except:
             # Fallback to environment variables if secrets are not available
             openai_key = os.getenv("OPENAI_API_KEY")
@@ -108,6 +143,10 @@ class Config:
         "Letter Print (2550x3300)": (2550, 3300)
     }
     
+    # Parallel name/dimension tuples for index-based access (e.g. selectbox positions)
+    AD_SIZE_NAMES = tuple(AD_SIZES)
+    AD_SIZE_DIMS = tuple(AD_SIZES.values())
+    
     # Ad mediums and their characteristics
     AD_MEDIUMS = {
         "Social Media - Instagram": {
@@ -219,6 +258,16 @@ class Config:
         }
     }
     
+    # Style keywords split once for prompt suggestions (ordered for display, frozensets for matching)
+    _STYLE_KEYWORD_TOKENS = {name: tuple(cfg.get('keywords', '').split(', ')) for name, cfg in STYLE_PRESETS.items()}
+    _STYLE_KEYWORD_FROZENSETS = {name: frozenset(tokens) for name, tokens in _STYLE_KEYWORD_TOKENS.items()}
+    
+    # Lookup fallbacks, bound once so the hit path doesn't evaluate them
+    _DEFAULT_STYLE_KEYWORDS = _STYLE_KEYWORD_TOKENS["Modern & Minimalist"]
+    _DEFAULT_STYLE_KEYWORD_SET = _STYLE_KEYWORD_FROZENSETS["Modern & Minimalist"]
+    _DEFAULT_RECOMMENDED_SIZES = ("Square (1080x1080) - Instagram Post",)
+    _DEFAULT_COLOR_SCHEME = ("#FFFFFF", "#000000")
+    
     # Color schemes
     COLOR_SCHEMES = {
         "Brand Colors": "Use the client's brand colors as primary palette",
@@ -263,57 +312,112 @@ class Config:
         return cls.AD_SIZES.get(size_name, (1080, 1080))
     
     @classmethod
-    def get_recommended_sizes(cls, medium: str) -> List[str]:
+    def get_dimensions_by_index(cls, index: int) -> Tuple[int, int]:
+        """Get dimensions for the predefined size at position index in AD_SIZE_NAMES"""
+        if 0 <= index < len(cls.AD_SIZE_DIMS):
+            return cls.AD_SIZE_DIMS[index]
+        return (1080, 1080)
+    
+    @classmethod
+    def get_recommended_sizes(cls, medium: str) -> Tuple[str, ...]:
         """Get recommended sizes for a specific medium"""
-        medium_config = cls.AD_MEDIUMS.get(medium, {})
-        return medium_config.get("recommended_sizes", ["Square (1080x1080) - Instagram Post"])
+        medium_config = cls.AD_MEDIUMS.get(medium)
+        if medium_config is None:
+            return cls._DEFAULT_RECOMMENDED_SIZES
+        return medium_config.get("recommended_sizes", cls._DEFAULT_RECOMMENDED_SIZES)
     
     @classmethod
-    def get_style_config(cls, style_name: str) -> Dict:
+    def get_style_config(cls, style_name: str) -> Mapping:
         """Get configuration for a style preset"""
-        return cls.STYLE_PRESETS.get(style_name, cls.STYLE_PRESETS["Modern & Minimalist"])
+        return cls.STYLE_PRESETS.get(style_name, cls._DEFAULT_STYLE)
     
     @classmethod
-    def get_color_scheme(cls, scheme_name: str) -> List[str]:
+    def get_style_keywords(cls, style_name: str) -> Tuple[str, ...]:
+        """Get the pre-split keywords for a style preset"""
+        return cls._STYLE_KEYWORD_TOKENS.get(style_name, cls._DEFAULT_STYLE_KEYWORDS)
+    
+    @classmethod
+    def get_style_keyword_set(cls, style_name: str) -> frozenset:
+        """Get the style preset keywords as a frozenset for token matching"""
+        return cls._STYLE_KEYWORD_FROZENSETS.get(style_name, cls._DEFAULT_STYLE_KEYWORD_SET)
+    
+    @classmethod
+    def get_color_scheme(cls, scheme_name: str) -> Tuple[str, ...]:
         """Get colors for a color scheme"""
-        return cls.COLOR_SCHEMES.get(scheme_name, ["#FFFFFF", "#000000"])
+        return cls.COLOR_SCHEMES.get(scheme_name, cls._DEFAULT_COLOR_SCHEME)
+    
+    @classmethod
+    def get_file_format_by_extension(cls, extension: str) -> Optional[str]:
+        """Get the FILE_FORMATS name for a file extension such as '.png'"""
+        return cls.FILE_FORMATS_BY_EXT.get(extension.lower())
+    
+    @classmethod
+    def get_file_format_by_mime(cls, mime_type: str) -> Optional[str]:
+        """Get the FILE_FORMATS name for a MIME type such as 'image/png'"""
+        return cls.FILE_FORMATS_BY_MIME.get(mime_type.lower())
     
     @classmethod
     def save_user_preferences(cls, preferences: Dict, filename: str = "user_preferences.json"):
-        """Save user preferences to file"""
+        """Save user preferences to file (written to a temp file, then atomically swapped in)"""
+        global _ASSETS_DIR_READY
+        path = f"assets/{filename}"
+        tmp_path = f"{path}.tmp"
         try:
-            os.makedirs("assets", exist_ok=True)
-            with open(f"assets/{filename}", 'w') as f:
-                json.dump(preferences, f, indent=2)
+            if not _ASSETS_DIR_READY:
+                os.makedirs("assets", exist_ok=True)
+                _ASSETS_DIR_READY = True
+            if _orjson is not None:
+                data = _orjson.dumps(preferences, option=_orjson.OPT_INDENT_2 | _orjson.OPT_NON_STR_KEYS)
+            else:
+                import json
+                data = json.dumps(preferences, indent=2).encode()
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
             return True
         except Exception:
             return False
     
     @classmethod
     def load_user_preferences(cls, filename: str = "user_preferences.json") -> Dict:
-        """Load user preferences from file"""
+        """Load user preferences from file, reusing the parsed result until the file changes"""
+        path = f"assets/{filename}"
         try:
-            with open(f"assets/{filename}", 'r') as f:
-                return json.load(f)
+            mtime = os.stat(path).st_mtime_ns
+            cached = _PREFS_CACHE.get(path)
+            if cached is None or cached[0] != mtime:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                if _orjson is not None:
+                    prefs = _orjson.loads(data)
+                else:
+                    import json
+                    prefs = json.loads(data)
+                cached = _PREFS_CACHE[path] = (mtime, prefs)
+            # Hand out a copy so callers can't mutate the cached dict
+            return dict(cached[1])
         except Exception:
             return {}
     
+    # Default prompt templates for different types of ads
+    DEFAULT_PROMPT_TEMPLATES = {
+        "Product Sale": "A professional advertisement for {product_name} featuring a {discount}% discount. Modern design with bold typography, vibrant colors, and clear pricing information. High-quality product photography with attractive sale badges.",
+        
+        "Service Promotion": "An elegant advertisement promoting {service_name} services. Professional and trustworthy design with client testimonials, service benefits, and clear call-to-action. Corporate color scheme with modern typography.",
+        
+        "Event Advertisement": "An exciting advertisement for {event_name} event. Dynamic and energetic design with event details, date, location, and registration information. Eye-catching graphics and vibrant color palette.",
+        
+        "Brand Awareness": "A sophisticated brand awareness advertisement for {brand_name}. Clean and minimalist design showcasing brand values, logo prominence, and memorable tagline. Professional color scheme matching brand identity.",
+        
+        "Holiday Campaign": "A festive advertisement for {holiday_name} campaign. Seasonal design elements, appropriate color scheme, special offers, and holiday-themed graphics. Warm and inviting atmosphere.",
+        
+        "New Product Launch": "An innovative advertisement announcing the launch of {product_name}. Modern and cutting-edge design highlighting product features, benefits, and availability. Technology-inspired color palette and typography."
+    }
+    
     @classmethod
-    def get_default_prompt_templates(cls) -> Dict[str, str]:
+    def get_default_prompt_templates(cls) -> Mapping[str, str]:
         """Get default prompt templates for different types of ads"""
-        return {
-            "Product Sale": "A professional advertisement for {product_name} featuring a {discount}% discount. Modern design with bold typography, vibrant colors, and clear pricing information. High-quality product photography with attractive sale badges.",
-            
-            "Service Promotion": "An elegant advertisement promoting {service_name} services. Professional and trustworthy design with client testimonials, service benefits, and clear call-to-action. Corporate color scheme with modern typography.",
-            
-            "Event Advertisement": "An exciting advertisement for {event_name} event. Dynamic and energetic design with event details, date, location, and registration information. Eye-catching graphics and vibrant color palette.",
-            
-            "Brand Awareness": "A sophisticated brand awareness advertisement for {brand_name}. Clean and minimalist design showcasing brand values, logo prominence, and memorable tagline. Professional color scheme matching brand identity.",
-            
-            "Holiday Campaign": "A festive advertisement for {holiday_name} campaign. Seasonal design elements, appropriate color scheme, special offers, and holiday-themed graphics. Warm and inviting atmosphere.",
-            
-            "New Product Launch": "An innovative advertisement announcing the launch of {product_name}. Modern and cutting-edge design highlighting product features, benefits, and availability. Technology-inspired color palette and typography."
-        }
+        return cls.DEFAULT_PROMPT_TEMPLATES
     
     # Application settings
     APP_CONFIG = {
@@ -324,4 +428,25 @@ class Config:
         "default_ai_model": "DALL-E 3",
         "cache_generated_images": True,
         "auto_save_preferences": True
-    }
\ No newline at end of file
+    }
+
+def _freeze(value):
+    """Recursively turn dicts into read-only mappings and lists into tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+# Presets are read-only lookup tables; freeze them once so they can't be mutated by accident
+Config.AD_SIZES = _freeze(Config.AD_SIZES)
+Config.AD_MEDIUMS = _freeze(Config.AD_MEDIUMS)
+Config.STYLE_PRESETS = _freeze(Config.STYLE_PRESETS)
+Config.COLOR_SCHEMES = _freeze(Config.COLOR_SCHEMES)
+Config.FILE_FORMATS = _freeze(Config.FILE_FORMATS)
+Config.DEFAULT_PROMPT_TEMPLATES = _freeze(Config.DEFAULT_PROMPT_TEMPLATES)
+Config._DEFAULT_STYLE = Config.STYLE_PRESETS["Modern & Minimalist"]
+
+# Reverse indexes so extension/MIME lookups don't iterate FILE_FORMATS
+Config.FILE_FORMATS_BY_EXT = MappingProxyType({fmt["extension"]: name for name, fmt in Config.FILE_FORMATS.items()})
+Config.FILE_FORMATS_BY_MIME = MappingProxyType({fmt["mime_type"]: name for name, fmt in Config.FILE_FORMATS.items()})
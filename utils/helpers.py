@@ -1,6 +1,34 @@
+import re
 import streamlit as st
-from utils.config import Config, EnvironmentManager
-from utils.ai_generator import APIKeyManager
+from utils.config import Config, EnvironmentManager, get_config_value, is_streamlit_deployment
+
+# Sidebar label for where API keys are read from, keyed by is_streamlit_deployment()
+_CONFIG_SOURCE_LABELS = {True: "Streamlit Secrets", False: "Environment Variables"}
+
+# Whole words, keeping hyphenated style keywords such as "eco-friendly" intact
+_WORD_RE = re.compile(r"[a-z]+(?:-[a-z]+)*")
+
+# Medium-specific prompt checks: (medium substring, expected prompt substring, suggestion)
+_MEDIUM_RULES = (
+    ("social media", "hashtag", "For social media, consider mentioning hashtag placement"),
+    ("print", "high resolution", "For print ads, specify high resolution and print-quality elements"),
+)
+
+def _build_api_status_markdown(has_openai, has_google, is_deployment):
+    """Build the combined sidebar markdown for API key status"""
+    hint = "🔐 Add {} to Streamlit secrets" if is_deployment else "📄 Add {} to your .env file"
+    lines = []
+    if has_openai:
+        lines.append("✅ OpenAI API Key configured")
+    else:
+        lines.append("❌ OpenAI API Key missing")
+        lines.append(hint.format("OPENAI_API_KEY"))
+    if has_google:
+        lines.append("✅ Google API Key configured")
+    else:
+        lines.append("⚠️ Google API Key missing (for Gemini)")
+        lines.append(hint.format("GOOGLE_API_KEY"))
+    return "  \n".join(lines)
 
 def setup_api_keys():
     """Setup and display API key configuration status"""
@@ -9,19 +37,19 @@ def setup_api_keys():
     st.sidebar.subheader("🔑 API Configuration")
     
     # Get API keys using the new EnvironmentManager
-    openai_key = EnvironmentManager.get_config_value("OPENAI_API_KEY")
-    google_key = EnvironmentManager.get_config_value("GOOGLE_API_KEY")
-    # nano_banana_key = EnvironmentManager.get_config_value("NANO_BANANA_API_KEY")
+    openai_key = get_config_value("OPENAI_API_KEY")
+    google_key = get_config_value("GOOGLE_API_KEY")
+    # nano_banana_key = get_config_value("NANO_BANANA_API_KEY")
     
     # Display deployment context
-    is_streamlit_deployment = EnvironmentManager.is_streamlit_deployment()
-    config_source = "Streamlit Secrets" if is_streamlit_deployment else "Environment Variables"
+    is_deployment = is_streamlit_deployment()
+    config_source = _CONFIG_SOURCE_LABELS[is_deployment]
     st.sidebar.info(f"📍 Config source: {config_source}")
     
     # Debug info for troubleshooting
     with st.sidebar.expander("🔍 API Key Debug Info", expanded=False):
         st.write(f"**Environment Detection:**")
-        st.write(f"- Streamlit deployment: {is_streamlit_deployment}")
+        st.write(f"- Streamlit deployment: {is_deployment}")
         st.write(f"- Config source: {config_source}")
         
         # Test explicit method too
@@ -32,23 +60,12 @@ def setup_api_keys():
             masked_value = f"...{key_value[-4:]}" if key_value else "None"
             st.write(f"- {key_name}: {status} ({masked_value})")
     
-    if openai_key:
-        st.sidebar.success("✅ OpenAI API Key configured")
-    else:
-        st.sidebar.error("❌ OpenAI API Key missing")
-        if is_streamlit_deployment:
-            st.sidebar.info("🔐 Add OPENAI_API_KEY to Streamlit secrets")
-        else:
-            st.sidebar.info("📄 Add OPENAI_API_KEY to your .env file")
-    
-    if google_key:
-        st.sidebar.success("✅ Google API Key configured")
-    else:
-        st.sidebar.warning("⚠️ Google API Key missing (for Gemini)")
-        if is_streamlit_deployment:
-            st.sidebar.info("🔐 Add GOOGLE_API_KEY to Streamlit secrets")
-        else:
-            st.sidebar.info("📄 Add GOOGLE_API_KEY to your .env file")
+    # Key status is rendered as one markdown block, rebuilt only when key presence changes
+    status_state = (bool(openai_key), bool(google_key), is_deployment)
+    if st.session_state.get('_api_sidebar_state') != status_state:
+        st.session_state['_api_sidebar_md'] = _build_api_status_markdown(*status_state)
+        st.session_state['_api_sidebar_state'] = status_state
+    st.sidebar.markdown(st.session_state['_api_sidebar_md'])
     
     # if nano_banana_key:
     #     st.sidebar.success("✅ Nano Banana API Key configured")
@@ -119,48 +136,60 @@ def display_usage_stats():
         with col2:
             st.metric("Success", stats['successful_generations'])
         
+        # Success rate and caption only change with the counters - reuse them otherwise
+        digest = (stats['total_generations'], stats['successful_generations'])
+        if st.session_state.get('_stats_digest') != digest:
+            total, successful = digest
+            rate = successful / total if total else 0.0
+            st.session_state['_stats_rate'] = (rate, f"Success Rate: {rate * 100:.1f}%")
+            st.session_state['_stats_digest'] = digest
+        
         if stats['total_generations'] > 0:
-            success_rate = (stats['successful_generations'] / stats['total_generations']) * 100
-            st.progress(success_rate / 100)
-            st.caption(f"Success Rate: {success_rate:.1f}%")
+            rate, caption = st.session_state['_stats_rate']
+            st.progress(rate)
+            st.caption(caption)
 
 def export_project_data():
     """Export generated ads and project data"""
     if st.sidebar.button("📦 Export Project Data"):
         try:
             import zipfile
-            import io
+            import tempfile
             import json
             from datetime import datetime
             
-            # Create zip buffer
-            zip_buffer = io.BytesIO()
+            # One timestamp for metadata, the PNG entry and the filename
+            now = datetime.now()
             
-            with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                # Add project metadata
-                metadata = {
-                    'export_date': datetime.now().isoformat(),
-                    'app_version': Config.APP_CONFIG['version'],
-                    'total_ads_generated': st.session_state.get('ads_generated', 0),
-                    'generation_params': st.session_state.get('generation_params', {})
-                }
+            # Small exports stay in memory, large ones spill to disk
+            with tempfile.SpooledTemporaryFile(max_size=2 << 20) as zip_buffer:
+                with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED, compresslevel=6) as zip_file:
+                    # Add project metadata
+                    metadata = {
+                        'export_date': now.isoformat(),
+                        'app_version': Config.APP_CONFIG['version'],
+                        'total_ads_generated': st.session_state.get('ads_generated', 0),
+                        'generation_params': st.session_state.get('generation_params', {})
+                    }
+                    
+                    zip_file.writestr('project_metadata.json', json.dumps(metadata, indent=2))
+                    
+                    # Add generated ad if available - PNG is already compressed, so store it
+                    # and save straight into the archive entry without an intermediate buffer
+                    if st.session_state.get('generated_ad'):
+                        png_info = zipfile.ZipInfo('generated_ad.png', date_time=now.timetuple()[:6])
+                        png_info.compress_type = zipfile.ZIP_STORED
+                        with zip_file.open(png_info, 'w', force_zip64=True) as png_entry:
+                            st.session_state.generated_ad.save(png_entry, format='PNG', optimize=False)
                 
-                zip_file.writestr('project_metadata.json', json.dumps(metadata, indent=2))
+                zip_buffer.seek(0)
                 
-                # Add generated ad if available
-                if st.session_state.get('generated_ad'):
-                    img_buffer = io.BytesIO()
-                    st.session_state.generated_ad.save(img_buffer, format='PNG')
-                    zip_file.writestr('generated_ad.png', img_buffer.getvalue())
-            
-            zip_buffer.seek(0)
-            
-            st.sidebar.download_button(
-                "💾 Download Project Export",
-                data=zip_buffer.getvalue(),
-                file_name=f"ad_creator_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
-                mime="application/zip"
-            )
+                st.sidebar.download_button(
+                    "💾 Download Project Export",
+                    data=zip_buffer.read(),
+                    file_name=f"ad_creator_export_{now.strftime('%Y%m%d_%H%M%S')}.zip",
+                    mime="application/zip"
+                )
             
         except Exception as e:
             st.sidebar.error(f"Export failed: {str(e)}")
@@ -169,14 +198,16 @@ def export_project_data():
 def validate_inputs(client_name, prompt):
     """Validate user inputs"""
     errors = []
+    client_name = client_name.strip()
+    prompt = prompt.strip()
     
-    if not client_name.strip():
+    if not client_name:
         errors.append("Client name is required")
     
-    if not prompt.strip():
+    if not prompt:
         errors.append("Creative prompt is required")
     
-    if len(prompt.strip()) < 10:
+    if len(prompt) < 10:
         errors.append("Prompt should be more descriptive (at least 10 characters)")
     
     return errors
@@ -184,23 +215,24 @@ def validate_inputs(client_name, prompt):
 def suggest_prompt_improvements(prompt, style, medium):
     """Suggest improvements for the user's prompt"""
     suggestions = []
+    prompt_lower = prompt.lower()
+    medium_lower = medium.lower()
+    tokens = prompt.split()
     
     # Check for style keywords
-    style_config = Config.get_style_config(style)
-    style_keywords = style_config.get('keywords', '').split(', ')
+    style_keywords = Config.get_style_keywords(style)
+    prompt_words = set(_WORD_RE.findall(prompt_lower))
     
-    if not any(keyword in prompt.lower() for keyword in style_keywords):
+    if Config.get_style_keyword_set(style).isdisjoint(prompt_words):
         suggestions.append(f"Consider adding style keywords like: {', '.join(style_keywords[:3])}")
     
     # Check for medium-specific elements
-    if "social media" in medium.lower() and "hashtag" not in prompt.lower():
-        suggestions.append("For social media, consider mentioning hashtag placement")
-    
-    if "print" in medium.lower() and "high resolution" not in prompt.lower():
-        suggestions.append("For print ads, specify high resolution and print-quality elements")
+    for medium_part, prompt_part, suggestion in _MEDIUM_RULES:
+        if medium_part in medium_lower and prompt_part not in prompt_lower:
+            suggestions.append(suggestion)
     
     # Check prompt length
-    if len(prompt.split()) < 15:
+    if len(tokens) < 15:
         suggestions.append("Try adding more descriptive details for better results")
     
     return suggestions
\ No newline at end of file
@@ -5,11 +5,239 @@ Provides professional image editing capabilities using Filerobot's Image Editor
 
 import streamlit as st
 import streamlit.components.v1 as components
-import base64
 from PIL import Image
 import io
 import os
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import functools
+
+# pybase64 (SIMD-accelerated) encodes large ads several times faster; stdlib binascii works
+# too. Both accept a memoryview, so the encoded image buffer is never copied to bytes
+try:
+    from pybase64 import b64encode as _b64encode
+except ImportError:
+    import binascii
+    
+    def _b64encode(data):
+        return binascii.b2a_base64(data, newline=False)
+
+# Drop the minified Filerobot bundle here to serve it inline instead of from the CDN
+FILEROBOT_VENDOR_PATH = os.path.join(os.path.dirname(__file__), "vendor", "filerobot-image-editor.min.js")
+FILEROBOT_CDN_URL = "https://cdn.scaleflex.it/plugins/filerobot-image-editor/4.0.0/filerobot-image-editor.min.js"
+
+# PNG encoding releases the GIL, so edited images are written off the script thread
+_SAVE_POOL = ThreadPoolExecutor(max_workers=2)
+
+@functools.lru_cache(maxsize=1)
+def _filerobot_script_tag() -> str:
+    """<script> tag for the editor bundle: inlined from the vendored copy if present, else the CDN"""
+    try:
+        with open(FILEROBOT_VENDOR_PATH, encoding="utf-8") as f:
+            bundle = f.read()
+    except OSError:
+        return f'<script src="{FILEROBOT_CDN_URL}"></script>'
+    # A literal </script> inside the bundle would close the inline tag early
+    return "<script>" + bundle.replace("</script", "<\\/script") + "</script>"
+
+def _encode_editor_source(img):
+    """Encode the ad for the editor's data URI, as JPEG unless it has real transparency
+    
+    Returns:
+        (mime type, base64 string)
+    """
+    if img.mode in ("RGBA", "LA") and img.getextrema()[-1] == (255, 255):
+        # Alpha channel is fully opaque - drop it so the image can go out as JPEG
+        img = img.convert("RGB" if img.mode == "RGBA" else "L")
+    
+    # Preallocate roughly the encoded size so the buffer doesn't grow by repeated doubling
+    as_jpeg = img.mode in ("RGB", "L")
+    pixels = img.size[0] * img.size[1]
+    buffered = io.BytesIO(bytes(max(1 << 16, pixels // 2 if as_jpeg else pixels * 2)))
+    if as_jpeg:
+        img.save(buffered, format="JPEG", quality=90, optimize=False)
+        mime = "image/jpeg"
+    else:
+        img.save(buffered, format="PNG", compress_level=1, optimize=False)
+        mime = "image/png"
+    
+    # Only the written prefix holds image data; the rest is unused preallocation
+    with buffered.getbuffer() as view, view[:buffered.tell()] as data:
+        return mime, _b64encode(data).decode('ascii')
+
+# Editor page template. Placeholders are filled with str.replace so the multi-MB
+# base64 payload is spliced in with a single copy and JS braces need no escaping
+_EDITOR_HTML_TEMPLATE = """
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Filerobot Image Editor</title>
+    __FILEROBOT_SCRIPT__
+    <style>
+        body {
+            margin: 0;
+            padding: 0;
+            font-family: Arial, sans-serif;
+        }
+        #editor-container {
+            width: 100%;
+            height: 650px;
+        }
+        #download-btn {
+            position: fixed;
+            bottom: 20px;
+            right: 20px;
+            z-index: 10000;
+            background: #4c6fff;
+            color: white;
+            border: none;
+            padding: 12px 24px;
+            border-radius: 6px;
+            font-size: 16px;
+            font-weight: bold;
+            cursor: pointer;
+            box-shadow: 0 4px 12px rgba(76, 111, 255, 0.4);
+            display: none;
+        }
+        #download-btn:hover {
+            background: #3d5ce6;
+            transform: translateY(-2px);
+            box-shadow: 0 6px 16px rgba(76, 111, 255, 0.5);
+        }
+        #download-btn:active {
+            transform: translateY(0);
+        }
+    </style>
+</head>
+<body>
+    <div id="editor-container"></div>
+    <button id="download-btn">⬇️ Download Edited Image</button>
+    
+    <script>
+        let currentEditor = null;
+        let hasEdits = false;
+        
+        const config = {
+            source: 'data:__IMG_MIME__;base64,__IMG_B64__',
+            defaultSavedImageName: 'edited_advertisement',
+            defaultSavedImageType: 'png',
+            savingPixelRatio: 1,
+            previewPixelRatio: 1,
+            observePluginContainerSize: true,
+            showCanvasOnly: false,
+            useBackendTranslations: false,
+            translations: {
+                en: {
+                    'header.image_editor_title': 'Edit Advertisement',
+                },
+            },
+            theme: {
+                palette: {
+                    'bg-primary': '#ffffff',
+                    'bg-secondary': '#f5f8fa',
+                    'accent-primary': '#4c6fff',
+                },
+            },
+            tabsIds: [
+                'Adjust',
+                'Annotate', 
+                'Watermark',
+                'Filters',
+                'Finetune',
+                'Resize',
+            ],
+            defaultTabId: 'Annotate',
+            Annotate: {
+                annotations: ['Text', 'Image', 'Rect', 'Ellipse', 'Polygon', 'Pen', 'Line', 'Arrow'],
+            },
+            Text: {
+                fonts: [
+                    'Arial',
+                    'Helvetica',
+                    'Times New Roman',
+                    'Courier',
+                    'Verdana',
+                    'Georgia',
+                    'Comic Sans MS',
+                    'Impact',
+                ],
+            },
+            onModify: () => {
+                // Show download button when user makes any edit
+                hasEdits = true;
+                document.getElementById('download-btn').style.display = 'block';
+            },
+            onSave: (editedImageObject, designState) => {
+                // This callback is triggered when user clicks Save in the editor
+                try {
+                    const imageBase64 = editedImageObject.imageBase64;
+                    
+                    // Convert base64 to blob
+                    const base64Data = imageBase64.split(',')[1];
+                    const byteCharacters = atob(base64Data);
+                    const byteNumbers = new Array(byteCharacters.length);
+                    for (let i = 0; i < byteCharacters.length; i++) {
+                        byteNumbers[i] = byteCharacters.charCodeAt(i);
+                    }
+                    const byteArray = new Uint8Array(byteNumbers);
+                    const blob = new Blob([byteArray], { type: 'image/png' });
+                    
+                    // Create download link
+                    const url = URL.createObjectURL(blob);
+                    const a = document.createElement('a');
+                    a.href = url;
+                    a.download = 'edited_advertisement_' + new Date().getTime() + '.png';
+                    document.body.appendChild(a);
+                    a.click();
+                    document.body.removeChild(a);
+                    URL.revokeObjectURL(url);
+                    
+                    alert('✅ Image downloaded successfully! Upload it below to replace your ad.');
+                } catch (error) {
+                    console.error('Save error:', error);
+                    alert('Error saving image: ' + error.message);
+                }
+            },
+        };
+        
+        // Initialize the editor
+        currentEditor = new FilerobotImageEditor(
+            document.querySelector('#editor-container'),
+            config
+        );
+        
+        // Render the editor
+        currentEditor.render();
+        
+        // Download button handler
+        document.getElementById('download-btn').addEventListener('click', async () => {
+            try {
+                // Trigger the editor's built-in save functionality
+                const saveButton = document.querySelector('[data-testid="save-button"]');
+                if (saveButton) {
+                    saveButton.click();
+                } else {
+                    // Try alternative selector
+                    const buttons = document.querySelectorAll('button');
+                    for (let btn of buttons) {
+                        if (btn.textContent.toLowerCase().includes('save')) {
+                            btn.click();
+                            return;
+                        }
+                    }
+                    alert('Please use the Save button in the editor toolbar at the top.');
+                }
+            } catch (error) {
+                console.error('Download error:', error);
+                alert('Please use the Save button in the editor toolbar at the top.');
+            }
+        });
+    </script>
+</body>
+</html>
+"""
 
 def show_image_editor():
     """Display Filerobot Image Editor for the generated advertisement"""
@@ -20,9 +248,17 @@ def show_image_editor():
     
     # Convert PIL Image to base64 for the editor
     img = st.session_state.generated_ad
-    buffered = io.BytesIO()
-    img.save(buffered, format="PNG")
-    img_base64 = base64.b64encode(buffered.getvalue()).decode()
+    
+    # Reruns of the same ad reuse the encoded data URI. The cache holds a reference
+    # to the image, so an identity match can't be a recycled id() of a freed object
+    cache_key = (img.size, img.mode)
+    if st.session_state.get('_ad_b64_img') is img and st.session_state.get('_ad_b64_key') == cache_key:
+        img_mime, img_base64 = st.session_state['_ad_b64']
+    else:
+        img_mime, img_base64 = _encode_editor_source(img)
+        st.session_state['_ad_b64'] = (img_mime, img_base64)
+        st.session_state['_ad_b64_img'] = img
+        st.session_state['_ad_b64_key'] = cache_key
     
     # Get image dimensions
     width, height = img.size
@@ -38,178 +274,13 @@ def show_image_editor():
     💡 You can also click the blue **"⬇️ Download"** button that appears after editing
     """)
     
-    # Filerobot Image Editor HTML/JavaScript
-    html_code = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Filerobot Image Editor</title>
-        <script src="https://cdn.scaleflex.it/plugins/filerobot-image-editor/4.0.0/filerobot-image-editor.min.js"></script>
-        <style>
-            body {{
-                margin: 0;
-                padding: 0;
-                font-family: Arial, sans-serif;
-            }}
-            #editor-container {{
-                width: 100%;
-                height: 650px;
-            }}
-            #download-btn {{
-                position: fixed;
-                bottom: 20px;
-                right: 20px;
-                z-index: 10000;
-                background: #4c6fff;
-                color: white;
-                border: none;
-                padding: 12px 24px;
-                border-radius: 6px;
-                font-size: 16px;
-                font-weight: bold;
-                cursor: pointer;
-                box-shadow: 0 4px 12px rgba(76, 111, 255, 0.4);
-                display: none;
-            }}
-            #download-btn:hover {{
-                background: #3d5ce6;
-                transform: translateY(-2px);
-                box-shadow: 0 6px 16px rgba(76, 111, 255, 0.5);
-            }}
-            #download-btn:active {{
-                transform: translateY(0);
-            }}
-        </style>
-    </head>
-    <body>
-        <div id="editor-container"></div>
-        <button id="download-btn">⬇️ Download Edited Image</button>
-        
-        <script>
-            let currentEditor = null;
-            let hasEdits = false;
-            
-            const config = {{
-                source: 'data:image/png;base64,{img_base64}',
-                defaultSavedImageName: 'edited_advertisement',
-                defaultSavedImageType: 'png',
-                savingPixelRatio: 1,
-                previewPixelRatio: 1,
-                observePluginContainerSize: true,
-                showCanvasOnly: false,
-                useBackendTranslations: false,
-                translations: {{
-                    en: {{
-                        'header.image_editor_title': 'Edit Advertisement',
-                    }},
-                }},
-                theme: {{
-                    palette: {{
-                        'bg-primary': '#ffffff',
-                        'bg-secondary': '#f5f8fa',
-                        'accent-primary': '#4c6fff',
-                    }},
-                }},
-                tabsIds: [
-                    'Adjust',
-                    'Annotate', 
-                    'Watermark',
-                    'Filters',
-                    'Finetune',
-                    'Resize',
-                ],
-                defaultTabId: 'Annotate',
-                Annotate: {{
-                    annotations: ['Text', 'Image', 'Rect', 'Ellipse', 'Polygon', 'Pen', 'Line', 'Arrow'],
-                }},
-                Text: {{
-                    fonts: [
-                        'Arial',
-                        'Helvetica',
-                        'Times New Roman',
-                        'Courier',
-                        'Verdana',
-                        'Georgia',
-                        'Comic Sans MS',
-                        'Impact',
-                    ],
-                }},
-                onModify: () => {{
-                    // Show download button when user makes any edit
-                    hasEdits = true;
-                    document.getElementById('download-btn').style.display = 'block';
-                }},
-                onSave: (editedImageObject, designState) => {{
-                    // This callback is triggered when user clicks Save in the editor
-                    try {{
-                        const imageBase64 = editedImageObject.imageBase64;
-                        
-                        // Convert base64 to blob
-                        const base64Data = imageBase64.split(',')[1];
-                        const byteCharacters = atob(base64Data);
-                        const byteNumbers = new Array(byteCharacters.length);
-                        for (let i = 0; i < byteCharacters.length; i++) {{
-                            byteNumbers[i] = byteCharacters.charCodeAt(i);
-                        }}
-                        const byteArray = new Uint8Array(byteNumbers);
-                        const blob = new Blob([byteArray], {{ type: 'image/png' }});
-                        
-                        // Create download link
-                        const url = URL.createObjectURL(blob);
-                        const a = document.createElement('a');
-                        a.href = url;
-                        a.download = 'edited_advertisement_' + new Date().getTime() + '.png';
-                        document.body.appendChild(a);
-                        a.click();
-                        document.body.removeChild(a);
-                        URL.revokeObjectURL(url);
-                        
-                        alert('✅ Image downloaded successfully! Upload it below to replace your ad.');
-                    }} catch (error) {{
-                        console.error('Save error:', error);
-                        alert('Error saving image: ' + error.message);
-                    }}
-                }},
-            }};
-            
-            // Initialize the editor
-            currentEditor = new FilerobotImageEditor(
-                document.querySelector('#editor-container'),
-                config
-            );
-            
-            // Render the editor
-            currentEditor.render();
-            
-            // Download button handler
-            document.getElementById('download-btn').addEventListener('click', async () => {{
-                try {{
-                    // Trigger the editor's built-in save functionality
-                    const saveButton = document.querySelector('[data-testid="save-button"]');
-                    if (saveButton) {{
-                        saveButton.click();
-                    }} else {{
-                        // Try alternative selector
-                        const buttons = document.querySelectorAll('button');
-                        for (let btn of buttons) {{
-                            if (btn.textContent.toLowerCase().includes('save')) {{
-                                btn.click();
-                                return;
-                            }}
-                        }}
-                        alert('Please use the Save button in the editor toolbar at the top.');
-                    }}
-                }} catch (error) {{
-                    console.error('Download error:', error);
-                    alert('Please use the Save button in the editor toolbar at the top.');
-                }}
-            }});
-        </script>
-    </body>
-    </html>
-    """
+    # Filerobot Image Editor HTML/JavaScript - base64 payload goes in last
+    html_code = (
+        _EDITOR_HTML_TEMPLATE
+        .replace("__FILEROBOT_SCRIPT__", _filerobot_script_tag())
+        .replace("__IMG_MIME__", img_mime)
+        .replace("__IMG_B64__", img_base64)
+    )
     
     # Display the editor
     components.html(html_code, height=750, scrolling=False)
@@ -227,10 +298,19 @@ def show_image_editor():
         help="Upload the image you just saved from the editor above"
     )
     
+    # Report a background save that failed after the previous run finished
+    pending_save = st.session_state.get('_edited_save')
+    if pending_save is not None and pending_save[0].done():
+        del st.session_state['_edited_save']
+        if pending_save[0].exception() is not None:
+            st.warning(f"Image replaced but couldn't save to file: {pending_save[0].exception()}")
+    
     if uploaded_edited is not None:
         try:
-            # Load the uploaded edited image
+            # Load the uploaded edited image - decode once up front so both the
+            # preview and the save below reuse the same pixel buffer
             edited_image = Image.open(uploaded_edited)
+            edited_image.load()
             
             # Show preview
             col1, col2 = st.columns(2)
@@ -254,8 +334,9 @@ def show_image_editor():
                     client_name = st.session_state.generation_params.get("client_name", "ad").replace(" ", "_")
                     filename = f"edited_{client_name}_{timestamp}.png"
                     filepath = os.path.join(output_dir, filename)
-                    edited_image.save(filepath, "PNG")
-                    st.success(f"✅ Image replaced and saved to: {filepath}")
+                    future = _SAVE_POOL.submit(edited_image.save, filepath, "PNG", optimize=False, compress_level=1)
+                    st.session_state['_edited_save'] = (future, filepath)
+                    st.success(f"✅ Image replaced and saving to: {filepath}")
                 except Exception as save_error:
                     st.warning(f"Image replaced but couldn't save to file: {str(save_error)}")
                 
@@ -290,7 +371,7 @@ def save_edited_image_to_file(image, filename):
         filepath = os.path.join(output_dir, f"edited_{timestamp}_{filename}")
         
         # Save the image
-        image.save(filepath, "PNG")
+        image.save(filepath, "PNG", compress_level=1, optimize=False)
         
         return filepath
     except Exception as e:
@@ -1,8 +1,35 @@
 from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageOps
-import io
-import numpy as np
-from typing import Tuple, Optional
+from typing import Dict, List, Optional
 import streamlit as st
+import functools
+
+@functools.lru_cache(maxsize=32)
+def _get_font(name: str, size: int):
+    """Load a TrueType font once per (name, size), falling back to Pillow's default"""
+    try:
+        return ImageFont.truetype(name, size)
+    except OSError:
+        return ImageFont.load_default()
+
+# Target sizes for ImageProcessor.resize_for_platform(s)
+PLATFORM_SIZES = {
+    "instagram_post": (1080, 1080),
+    "instagram_story": (1080, 1920),
+    "facebook_post": (1200, 630),
+    "facebook_cover": (820, 312),
+    "twitter_post": (1200, 675),
+    "linkedin_post": (1200, 627),
+    "youtube_thumbnail": (1280, 720)
+}
+
+# Filters supported by ImageProcessor.apply_filter, keyed by lowercase name
+_FILTERS = {
+    "blur": lambda image: image.filter(ImageFilter.GaussianBlur(radius=2)),
+    "sharpen": lambda image: image.filter(ImageFilter.SHARPEN),
+    "emboss": lambda image: image.filter(ImageFilter.EMBOSS),
+    "edge": lambda image: image.filter(ImageFilter.FIND_EDGES),
+    "smooth": lambda image: image.filter(ImageFilter.SMOOTH),
+}
 
 class ImageProcessor:
     """
@@ -41,50 +68,15 @@ class ImageProcessor:
             st.error(f"Error processing logo: {str(e)}")
             return None
     
-    # ========================================
-    # DEPRECATED FUNCTIONS - Template System Handles These Tasks
-    # ========================================
-    # The following functions are no longer needed since:
-    # 1. Template system handles logo placement and sizing
-    # 2. Reference images provide better AI guidance
-    # 3. Templates ensure precise brand element positioning
-    
-    @staticmethod
-    def remove_background_basic(image: Image.Image) -> Image.Image:
-        """DEPRECATED: Basic background removal - templates handle logo placement better"""
-        # Templates place logos with proper transparency handling
-        return image
-    
-    @staticmethod
-    def resize_logo(logo: Image.Image, max_size: int = 200) -> Image.Image:
-        """DEPRECATED: Logo resizing - template_manager._resize_logo_to_area() handles this"""
-        # Template manager has smarter resizing for specific template areas
-        return logo
-    
-    @staticmethod
-    def add_logo_to_ad(ad_image: Image.Image, logo: Image.Image, 
-                       position: str = "bottom-right") -> Image.Image:
-        """DEPRECATED: Logo placement - templates provide precise positioning"""
-        # Templates handle logo placement with perfect positioning
-        return ad_image
-    
-    @staticmethod
-    def apply_brand_colors(image: Image.Image, primary_color: str, 
-                          secondary_color: str = None) -> Image.Image:
-        """Apply brand colors to the image (basic color overlay)"""
-        try:
-            # This is a placeholder for brand color application
-            # In practice, this would involve more sophisticated color manipulation
-            return image
-        except Exception:
-            return image
-    
     @staticmethod
     def enhance_image_quality(image: Image.Image) -> Image.Image:
         """Apply quality enhancements to the generated image"""
         try:
+            # autocontrast has no alpha support, so enhance the colour bands and reattach alpha
+            color = image.convert("RGB") if image.mode == "RGBA" else image
+            
             # Apply subtle sharpening
-            enhanced = image.filter(ImageFilter.UnsharpMask(
+            enhanced = color.filter(ImageFilter.UnsharpMask(
                 radius=1, 
                 percent=150, 
                 threshold=3
@@ -93,6 +85,8 @@ class ImageProcessor:
             # Enhance contrast slightly
             enhanced = ImageOps.autocontrast(enhanced, cutoff=0.5)
             
+            if image.mode == "RGBA":
+                enhanced.putalpha(image.getchannel("A"))
             return enhanced
             
         except Exception:
@@ -100,24 +94,26 @@ class ImageProcessor:
     
     @staticmethod
     def add_text_overlay(image: Image.Image, text: str, position: str = "center",
-                        font_size: int = None, color: str = "white") -> Image.Image:
-        """Add text overlay to image"""
+                        font_size: int = None, color: str = "white",
+                        in_place: bool = False) -> Image.Image:
+        """Add text overlay to image
+        
+        The text is rendered on a small transparent layer the size of its bounding box
+        and composited onto the target region. With in_place=True the input image is
+        drawn on directly instead of being copied first.
+        """
         try:
-            # Make a copy
-            result = image.copy()
-            draw = ImageDraw.Draw(result)
+            result = image if in_place else image.copy()
             
             # Calculate font size if not provided
             if font_size is None:
                 font_size = min(result.size) // 20
             
             # Try to load a good font
-            try:
-                font = ImageFont.truetype("arial.ttf", font_size)
-            except:
-                font = ImageFont.load_default()
+            font = _get_font("arial.ttf", font_size)
             
-            # Get text bounding box
+            # Get text bounding box (textbbox lays out multiline text like draw.text does)
+            draw = ImageDraw.Draw(result)
             bbox = draw.textbbox((0, 0), text, font=font)
             text_width = bbox[2] - bbox[0]
             text_height = bbox[3] - bbox[1]
@@ -141,13 +137,25 @@ class ImageProcessor:
             # Add text with outline for better visibility
             outline_color = "black" if color == "white" else "white"
             
-            # Draw outline
-            for adj in range(-2, 3):
-                for adj2 in range(-2, 3):
-                    draw.text((x + adj, y + adj2), text, font=font, fill=outline_color)
-            
-            # Draw main text
-            draw.text((x, y), text, font=font, fill=color)
+            # Draw text and its 2px outline in a single rasterization pass on a layer
+            # just big enough for the glyphs plus the stroke
+            pad = 4
+            ink = draw.textbbox((0, 0), text, font=font, stroke_width=2)
+            layer = Image.new('RGBA', (ink[2] - ink[0] + 2 * pad, ink[3] - ink[1] + 2 * pad), (0, 0, 0, 0))
+            ImageDraw.Draw(layer).text((pad - ink[0], pad - ink[1]), text, font=font,
+                                       fill=color, stroke_width=2, stroke_fill=outline_color)
+            
+            # Clip the layer to the image so text near/over the edges still composites
+            left, top = x + ink[0] - pad, y + ink[1] - pad
+            crop_left, crop_top = max(0, -left), max(0, -top)
+            if crop_left or crop_top:
+                layer = layer.crop((crop_left, crop_top, layer.width, layer.height))
+            dest = (left + crop_left, top + crop_top)
+            
+            if result.mode == 'RGBA':
+                result.alpha_composite(layer, dest=dest)
+            else:
+                result.paste(layer, dest, layer)
             
             return result
             
@@ -159,6 +167,8 @@ class ImageProcessor:
     def create_border(image: Image.Image, border_width: int = 5, 
                      border_color: str = "white") -> Image.Image:
         """Add a border to the image"""
+        if border_width <= 0:
+            return image
         try:
             return ImageOps.expand(image, border=border_width, fill=border_color)
         except Exception:
@@ -167,37 +177,45 @@ class ImageProcessor:
     @staticmethod
     def resize_for_platform(image: Image.Image, platform: str) -> Image.Image:
         """Resize image for specific social media platforms"""
-        platform_sizes = {
-            "instagram_post": (1080, 1080),
-            "instagram_story": (1080, 1920),
-            "facebook_post": (1200, 630),
-            "facebook_cover": (820, 312),
-            "twitter_post": (1200, 675),
-            "linkedin_post": (1200, 627),
-            "youtube_thumbnail": (1280, 720)
-        }
-        
-        target_size = platform_sizes.get(platform.lower())
+        target_size = PLATFORM_SIZES.get(platform.lower())
         if target_size:
+            if target_size[0] <= image.width and target_size[1] <= image.height:
+                # Shrinking: box-reduce first so LANCZOS only runs on a near-final image
+                return image.resize(target_size, Image.Resampling.LANCZOS, reducing_gap=3.0)
             return image.resize(target_size, Image.Resampling.LANCZOS)
         return image
     
+    @staticmethod
+    def resize_for_platforms(image: Image.Image, platforms: List[str]) -> Dict[str, Image.Image]:
+        """Resize one image for several platforms, largest target first
+        
+        Each downscale starts from the smallest earlier result that still covers the
+        target, so small sizes don't re-run LANCZOS over the full source.
+        Unknown platforms map to the original image, as in resize_for_platform.
+        """
+        known = [p for p in platforms if p.lower() in PLATFORM_SIZES]
+        known.sort(key=lambda p: -PLATFORM_SIZES[p.lower()][0] * PLATFORM_SIZES[p.lower()][1])
+        
+        results = {p: image for p in platforms if p.lower() not in PLATFORM_SIZES}
+        sources = [image]
+        for platform in known:
+            width, height = PLATFORM_SIZES[platform.lower()]
+            # Never upscale an intermediate - fall back to the source if nothing covers the target
+            source = next((s for s in reversed(sources) if s.width >= width and s.height >= height), image)
+            if source is image and (width > image.width or height > image.height):
+                resized = image.resize((width, height), Image.Resampling.LANCZOS)
+            else:
+                resized = source.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=2.0)
+                sources.append(resized)
+            results[platform] = resized
+        return {p: results[p] for p in platforms}
+    
     @staticmethod
     def apply_filter(image: Image.Image, filter_type: str) -> Image.Image:
         """Apply various filters to the image"""
         try:
-            if filter_type == "blur":
-                return image.filter(ImageFilter.GaussianBlur(radius=2))
-            elif filter_type == "sharpen":
-                return image.filter(ImageFilter.SHARPEN)
-            elif filter_type == "emboss":
-                return image.filter(ImageFilter.EMBOSS)
-            elif filter_type == "edge":
-                return image.filter(ImageFilter.FIND_EDGES)
-            elif filter_type == "smooth":
-                return image.filter(ImageFilter.SMOOTH)
-            else:
-                return image
+            apply = _FILTERS.get(filter_type.lower())
+            return apply(image) if apply else image
         except Exception:
             return image
     
@@ -213,12 +231,16 @@ class ImageProcessor:
             filepath = f"assets/generated_ads/{filename}"
             
             if format.upper() == "JPEG" or format.upper() == "JPG":
-                # Convert RGBA to RGB for JPEG
+                # Convert RGBA to RGB for JPEG - flatten onto white using only the
+                # alpha band rather than splitting out all four channels
                 if image.mode == 'RGBA':
                     background = Image.new('RGB', image.size, (255, 255, 255))
-                    background.paste(image, mask=image.split()[-1])
+                    background.paste(image, mask=image.getchannel('A'))
                     image = background
-                image.save(filepath, format="JPEG", quality=quality)
+                image.save(filepath, format="JPEG", quality=quality, optimize=False, progressive=False)
+            elif format.upper() == "PNG":
+                # Local assets only - fast zlib level beats the ~15% size saving of level 6
+                image.save(filepath, format="PNG", compress_level=1, optimize=False)
             else:
                 image.save(filepath, format=format.upper())
             
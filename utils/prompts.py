@@ -3,6 +3,11 @@ Centralized Prompt Management System
 Contains all AI prompts used throughout the application for easy editing and maintenance
 """
 
+import functools
+import hashlib
+import re
+import string
+
 class PromptTemplates:
     """Centralized storage for all AI generation prompts"""
     
@@ -39,18 +44,20 @@ class PromptTemplates:
     The template system will add all text, logos, and promotional content as overlays.
     
     NOTE: This prompt is for OVERLAY mode only. AI-native cinematic templates use a different prompting system (template_prompts.py).
-    """
+    """.strip()
     
     # Enhanced Prompt Building for Non-Template Generation
     ENHANCED_PROMPT_BASE = "Create a professional advertisement for {client_name}. The company name '{client_name}' must be prominently displayed as the main brand element."
     
     # Company name requirements
-    COMPANY_NAME_REQUIREMENTS = [
+    COMPANY_NAME_REQUIREMENTS = (
         "CRITICAL: The company name '{client_name}' must be clearly visible and prominent in the advertisement.",
         "Display '{client_name}' as the primary brand element with large, readable typography.",
         "Position the company name '{client_name}' prominently in the upper portion of the design.",
         "Use high contrast colors to ensure '{client_name}' stands out against the background."
-    ]
+    )
+    # Pre-joined so the whole block is substituted with a single format pass
+    COMPANY_NAME_REQUIREMENTS_JOINED = " ".join(COMPANY_NAME_REQUIREMENTS)
     
     # Medium-specific enhancements
     MEDIUM_ENHANCEMENTS = {
@@ -93,35 +100,36 @@ class PromptTemplates:
     
     # Final quality guidelines
     QUALITY_GUIDELINES = {
-        "base": [
+        "base": (
             "Create flat advertisement design, not a mockup or 3D visualization.",
             "Design should be the actual advertisement content, ready for use.",
             "MUST include the actual company name '{client_name}' prominently in the design.",
             "DO NOT add fake or generic company names - use only the provided client name '{client_name}'.",
             "Ensure the company name '{client_name}' is the most prominent text element."
-        ],
+        ),
         "billboard": "Requirements: High contrast, bold visuals, minimal text, maximum impact. Company name '{client_name}' must be the largest text element.",
         "social_media": "Requirements: Mobile-optimized, engaging visuals, clear focal point. Company name '{client_name}' must be clearly readable on mobile devices.",
         "default": "Requirements: Professional design with clear brand message. Company name '{client_name}' must be the primary brand identifier.",
         "output": "Output: Clean, flat advertisement design without frames, mockups, or 3D effects. Company name '{client_name}' prominently displayed."
     }
+    QUALITY_GUIDELINES_BASE_JOINED = " ".join(QUALITY_GUIDELINES["base"])
     
     # Nano Banana Pro Advanced Features Prompts
     NANO_BANANA_PRO_ENHANCEMENTS = {
         "search_grounding": "Use current real-world knowledge and verified information. Ensure factual accuracy for any maps, diagrams, or informational content.",
         "text_rendering": "Generate clear, professional text within the image. Use appropriate typography with proper font selection and natural text placement. Ensure text is readable and well-integrated into the design.",
-        "quality_enhancement": [
+        "quality_enhancement": (
             "Create enterprise-grade visual asset with 4K quality and sharp details.",
             "Maintain strong brand consistency and creative control.",
             "Use advanced composition with proper lighting and perspective.",
             "Professional design suitable for commercial use."
-        ]
+        )
     }
     
     # Auto-detection keywords for advanced features
     DETECTION_KEYWORDS = {
-        "search": ['infographic', 'facts', 'map', 'diagram', 'chart', 'data', 'real', 'accurate', 'current', 'geography', 'statistics'],
-        "text": ['text', 'typography', 'sign', 'poster', 'banner', 'label', 'headline', 'slogan', 'tagline', 'words', 'font']
+        "search": ('infographic', 'facts', 'map', 'diagram', 'chart', 'data', 'real', 'accurate', 'current', 'geography', 'statistics'),
+        "text": ('text', 'typography', 'sign', 'poster', 'banner', 'label', 'headline', 'slogan', 'tagline', 'words', 'font')
     }
     
     # Logo analysis prompts
@@ -132,127 +140,293 @@ class PromptTemplates:
     
     # Theme extraction filters
     THEME_EXTRACTION = {
-        "sale_terms": ['sale', 'off', '%', 'percent', 'discount', 'deal', 'special', 'limited', 'save'],
-        "skip_words": ['the', 'and', 'for', 'with', 'get', 'now'],
+        "sale_terms": ('sale', 'off', '%', 'percent', 'discount', 'deal', 'special', 'limited', 'save'),
+        "skip_words": ('the', 'and', 'for', 'with', 'get', 'now'),
         "fallback_themes": {
             "empty": "professional business theme",
             "no_words": "modern business theme"
         }
     }
 
+# Advanced-feature detection: one alternation per category, matched as plain substrings
+_DETECT_SEARCH_RE = re.compile("|".join(map(re.escape, PromptTemplates.DETECTION_KEYWORDS["search"])))
+_DETECT_TEXT_RE = re.compile("|".join(map(re.escape, PromptTemplates.DETECTION_KEYWORDS["text"])))
+
+# Logo analysis results keyed by a digest of the logo's header bytes and total size
+_LOGO_ANALYSIS_CACHE = {}
+_LOGO_CACHE_MAX = 128
+
+# LOGO_ANALYSIS["basic"] pre-formatted for each aspect ratio: square, horizontal, vertical
+_LOGO_DESCRIPTIONS = tuple(
+    PromptTemplates.LOGO_ANALYSIS["basic"].format(aspect_ratio=aspect_ratio)
+    for aspect_ratio in ("square", "horizontal", "vertical")
+)
+
+# Theme extraction filters compiled once: one regex scan replaces the per-term substring checks
+_THEME_SALE_RE = re.compile("|".join(map(re.escape, PromptTemplates.THEME_EXTRACTION["sale_terms"])))
+_THEME_SKIP_WORDS = frozenset(PromptTemplates.THEME_EXTRACTION["skip_words"])
+_THEME_SCAN_CHARS = 512
+
+def _classify_medium(medium_lower):
+    """Classify a lowercased medium: (MEDIUM_ENHANCEMENTS key, is billboard, is social media)"""
+    is_billboard = "billboard" in medium_lower
+    is_social = "social media" in medium_lower
+    if is_billboard or "outdoor" in medium_lower:
+        enhancement = "billboard"
+    elif is_social:
+        enhancement = "social media"
+    elif "web" in medium_lower or "banner" in medium_lower:
+        enhancement = "web"
+    else:
+        enhancement = "default"
+    return enhancement, is_billboard, is_social
+
+# Medium profiles by exact lowercased name - seeded with the bare keywords and
+# filled in on first use for full medium names such as "social media - instagram"
+_MEDIUM_PROFILES = {
+    medium: _classify_medium(medium)
+    for medium in ("billboard", "outdoor", "social media", "web", "banner")
+}
+_MEDIUM_PROFILES_MAX = 256
+
+def _medium_profile(medium_lower):
+    """Look up the medium profile, classifying unseen mediums by substring once"""
+    profile = _MEDIUM_PROFILES.get(medium_lower)
+    if profile is None:
+        profile = _classify_medium(medium_lower)
+        if len(_MEDIUM_PROFILES) < _MEDIUM_PROFILES_MAX:
+            _MEDIUM_PROFILES[medium_lower] = profile
+    return profile
+
+@functools.lru_cache(maxsize=16)
+def _color_scheme_bucket(color_scheme):
+    """Map a colour scheme name to its COLOR_SCHEME_GUIDANCE key"""
+    return "brand colors" if color_scheme.lower() == "brand colors" else "default"
+
+def _compile_template(template):
+    """Turn a str.format template into a closure that renders it from a mapping
+    
+    The template is parsed once here into a list of literal segments with empty
+    slots for the placeholders; rendering copies that list, fills the slots and
+    joins it, so no per-call parsing or growing of an accumulator is needed.
+    """
+    pieces = []
+    slots = []
+    for literal, field, _, _ in string.Formatter().parse(template):
+        if literal:
+            pieces.append(literal)
+        if field is not None:
+            slots.append((len(pieces), field))
+            pieces.append(None)
+    slots = tuple(slots)
+    
+    def render(values):
+        out = pieces.copy()
+        for index, field in slots:
+            out[index] = str(values[field])
+        return "".join(out)
+    
+    return render
+
+_render_template_background = _compile_template(PromptTemplates.TEMPLATE_BACKGROUND_BASE)
+
+@functools.lru_cache(maxsize=256)
+def _build_template_background(style, color_scheme, theme_keywords, width, height, logo_width, logo_height):
+    """Render the template background prompt; memoized since campaigns repeat the same inputs"""
+    return _render_template_background({
+        "style": style,
+        "color_scheme": color_scheme,
+        "theme_keywords": theme_keywords,
+        "width": width,
+        "height": height,
+        "logo_width": logo_width,
+        "logo_height": logo_height,
+    })
+
+@functools.lru_cache(maxsize=64)
+def _compile_enhanced_prompt(medium_bucket, is_billboard, is_social, format_bucket, color_bucket,
+                             has_tagline, has_logo, include_text, include_cta, has_website):
+    """Assemble the enhanced-prompt skeleton for one combination of options
+    
+    Static fragments are joined once per combination and compiled into render
+    closures for the text before and after the per-ad message.
+    """
+    templates = PromptTemplates
+    typography = templates.TYPOGRAPHY_GUIDANCE
+    cta = templates.CTA_GUIDANCE
+    quality = templates.QUALITY_GUIDELINES
+    
+    parts = [templates.ENHANCED_PROMPT_BASE]
+    
+    # Add company name requirements FIRST
+    parts.append(templates.COMPANY_NAME_REQUIREMENTS_JOINED)
+    
+    # Add tagline if provided
+    if has_tagline:
+        parts.append("Include the tagline: '{tagline}' beneath or near the company name '{client_name}'.")
+    
+    # Medium, style, color scheme and format guidance. The default enhancement keeps its
+    # {medium} placeholder: it is filled by the same render pass as the other fields and
+    # cached with the rest of the campaign boilerplate, so it is never formatted on its own
+    parts.append(templates.MEDIUM_ENHANCEMENTS[medium_bucket])
+    parts.append(templates.STYLE_GUIDANCE)
+    parts.append(templates.COLOR_SCHEME_GUIDANCE[color_bucket])
+    parts.append(templates.FORMAT_GUIDANCE[format_bucket])
+    
+    # Logo integration
+    if has_logo:
+        parts.append("{logo_description}")
+    
+    # Typography guidance with company name emphasis
+    if include_text:
+        if is_billboard:
+            parts.append(typography["billboard"])
+            parts.append("Make '{client_name}' the largest and most prominent text element.")
+        else:
+            parts.append(typography["default"])
+            parts.append("Ensure '{client_name}' has the highest visual hierarchy.")
+    
+    # CTA guidance
+    if include_cta:
+        if has_website:
+            parts.append(cta["with_website_billboard" if is_billboard else "with_website_default"])
+        else:
+            parts.append(cta["without_website"])
+    
+    # Main message (secondary to company name)
+    parts.append("Secondary message: {prompt} (this should complement, not overshadow the company name '{client_name}')")
+    
+    # Quality guidelines with company name emphasis
+    parts.append(templates.QUALITY_GUIDELINES_BASE_JOINED)
+    if is_billboard:
+        parts.append(quality["billboard"])
+    elif is_social:
+        parts.append(quality["social_media"])
+    else:
+        parts.append(quality["default"])
+    parts.append(quality["output"])
+    
+    prefix, _, suffix = " ".join(parts).partition("{prompt}")
+    return _compile_template(prefix), _compile_template(suffix)
+
+@functools.lru_cache(maxsize=128)
+def _render_stable_parts(client_name, client_website, medium, style, color_scheme, width, height,
+                         include_text, include_cta, logo_description, client_tagline):
+    """Render the enhanced prompt around the per-ad message: (prefix, suffix)
+    
+    Everything except the message stays the same across the ads of a campaign,
+    so it is rendered once per distinct set of campaign inputs.
+    """
+    medium_lower = medium.lower()
+    medium_bucket, is_billboard, is_social = _medium_profile(medium_lower)
+    format_bucket = "square" if width == height else ("landscape" if width > height else "portrait")
+    
+    render_prefix, render_suffix = _compile_enhanced_prompt(
+        medium_bucket, is_billboard, is_social, format_bucket,
+        _color_scheme_bucket(color_scheme),
+        bool(client_tagline and client_tagline.strip()),
+        bool(logo_description), bool(include_text), bool(include_cta), bool(client_website)
+    )
+    values = {
+        "client_name": client_name,
+        "tagline": client_tagline,
+        "medium": medium_lower,
+        "style": style,
+        "color_scheme": color_scheme,
+        "width": width,
+        "height": height,
+        "logo_description": logo_description,
+        "website": client_website,
+    }
+    return render_prefix(values), render_suffix(values)
+
+def _pick_theme_words(words):
+    """First five words that survive the theme filters"""
+    sale_search = _THEME_SALE_RE.search
+    theme_words = []
+    for word in words:
+        if len(word) > 2 and word not in _THEME_SKIP_WORDS and not word.isdigit() and not sale_search(word):
+            theme_words.append(word)
+            if len(theme_words) == 5:
+                break
+    return theme_words
+
+@functools.lru_cache(maxsize=256)
+def _extract_theme_keywords(content_prompt):
+    """Theme keywords for a content prompt; memoized since regenerations reuse the prompt"""
+    # Lowercase and tokenize once; only five theme words are kept, so long prompts
+    # are scanned from a bounded prefix first and in full only if that falls short
+    words = content_prompt[:_THEME_SCAN_CHARS].lower().split()
+    truncated = len(content_prompt) > _THEME_SCAN_CHARS
+    if truncated and words and not content_prompt[_THEME_SCAN_CHARS - 1].isspace() and not content_prompt[_THEME_SCAN_CHARS].isspace():
+        # Drop the word cut in half at the boundary
+        words.pop()
+    theme_words = _pick_theme_words(words)
+    if truncated and len(theme_words) < 5:
+        words = content_prompt.lower().split()
+        theme_words = _pick_theme_words(words)
+    if not words:
+        return PromptTemplates.THEME_EXTRACTION["fallback_themes"]["empty"]
+    
+    if not theme_words:
+        return PromptTemplates.THEME_EXTRACTION["fallback_themes"]["no_words"]
+    
+    clean_theme = " ".join(theme_words)
+    return f"{clean_theme} theme with professional aesthetic"
+
 class PromptBuilder:
     """Helper class to build prompts from templates"""
     
     @staticmethod
     def build_template_background_prompt(template, style, color_scheme, theme_keywords):
         """Build template background generation prompt"""
-        return PromptTemplates.TEMPLATE_BACKGROUND_BASE.format(
-            style=style,
-            color_scheme=color_scheme,
-            theme_keywords=theme_keywords,
-            width=template['dimensions'][0],
-            height=template['dimensions'][1],
-            logo_width=template['logo_area']['width'],
-            logo_height=template['logo_area']['height']
-        ).strip()
+        return _build_template_background(
+            style, color_scheme, theme_keywords,
+            template['dimensions'][0], template['dimensions'][1],
+            template['logo_area']['width'], template['logo_area']['height']
+        )
     
     @staticmethod
     def build_enhanced_prompt(prompt, client_name, client_website, medium, style, 
                             color_scheme, include_text, include_cta, dimensions, 
                             logo_description="", client_tagline=""):
         """Build enhanced prompt for non-template generation with strong company name emphasis"""
-        enhanced_parts = [PromptTemplates.ENHANCED_PROMPT_BASE.format(client_name=client_name)]
-        
-        # Add company name requirements FIRST
-        for requirement in PromptTemplates.COMPANY_NAME_REQUIREMENTS:
-            enhanced_parts.append(requirement.format(client_name=client_name))
-        
-        # Add tagline if provided
-        if client_tagline and client_tagline.strip():
-            enhanced_parts.append(f"Include the tagline: '{client_tagline}' beneath or near the company name '{client_name}'.")
-        
-        # Medium-specific enhancements
-        medium_lower = medium.lower()
-        if "billboard" in medium_lower or "outdoor" in medium_lower:
-            enhanced_parts.append(PromptTemplates.MEDIUM_ENHANCEMENTS["billboard"])
-        elif "social media" in medium_lower:
-            enhanced_parts.append(PromptTemplates.MEDIUM_ENHANCEMENTS["social media"])
-        elif "web" in medium_lower or "banner" in medium_lower:
-            enhanced_parts.append(PromptTemplates.MEDIUM_ENHANCEMENTS["web"])
-        else:
-            enhanced_parts.append(PromptTemplates.MEDIUM_ENHANCEMENTS["default"].format(medium=medium_lower))
-        
-        # Style guidance
-        enhanced_parts.append(PromptTemplates.STYLE_GUIDANCE.format(style=style))
-        
-        # Color scheme guidance
-        if color_scheme.lower() == "brand colors":
-            enhanced_parts.append(PromptTemplates.COLOR_SCHEME_GUIDANCE["brand colors"].format(client_name=client_name))
-        else:
-            enhanced_parts.append(PromptTemplates.COLOR_SCHEME_GUIDANCE["default"].format(color_scheme=color_scheme))
-        
-        # Format guidance
         width, height = dimensions
-        if width == height:
-            enhanced_parts.append(PromptTemplates.FORMAT_GUIDANCE["square"].format(width=width, height=height))
-        elif width > height:
-            enhanced_parts.append(PromptTemplates.FORMAT_GUIDANCE["landscape"].format(width=width, height=height))
-        else:
-            enhanced_parts.append(PromptTemplates.FORMAT_GUIDANCE["portrait"].format(width=width, height=height))
-        
-        # Logo integration
-        if logo_description:
-            enhanced_parts.append(logo_description)
-        
-        # Typography guidance with company name emphasis
-        if include_text:
-            if "billboard" in medium_lower:
-                enhanced_parts.append(PromptTemplates.TYPOGRAPHY_GUIDANCE["billboard"])
-                enhanced_parts.append(f"Make '{client_name}' the largest and most prominent text element.")
-            else:
-                enhanced_parts.append(PromptTemplates.TYPOGRAPHY_GUIDANCE["default"])
-                enhanced_parts.append(f"Ensure '{client_name}' has the highest visual hierarchy.")
-        
-        # CTA guidance
-        if include_cta:
-            if client_website:
-                if "billboard" in medium_lower:
-                    enhanced_parts.append(PromptTemplates.CTA_GUIDANCE["with_website_billboard"].format(website=client_website))
-                else:
-                    enhanced_parts.append(PromptTemplates.CTA_GUIDANCE["with_website_default"].format(website=client_website))
-            else:
-                enhanced_parts.append(PromptTemplates.CTA_GUIDANCE["without_website"])
-        
-        # Main message (secondary to company name)
-        enhanced_parts.append(f"Secondary message: {prompt} (this should complement, not overshadow the company name '{client_name}')")
-        
-        # Quality guidelines with company name emphasis
-        for guideline in PromptTemplates.QUALITY_GUIDELINES["base"]:
-            enhanced_parts.append(guideline.format(client_name=client_name))
-        
-        if "billboard" in medium_lower:
-            enhanced_parts.append(PromptTemplates.QUALITY_GUIDELINES["billboard"].format(client_name=client_name))
-        elif "social media" in medium_lower:
-            enhanced_parts.append(PromptTemplates.QUALITY_GUIDELINES["social_media"].format(client_name=client_name))
-        else:
-            enhanced_parts.append(PromptTemplates.QUALITY_GUIDELINES["default"].format(client_name=client_name))
-        
-        enhanced_parts.append(PromptTemplates.QUALITY_GUIDELINES["output"].format(client_name=client_name))
+        prefix, suffix = _render_stable_parts(
+            client_name, client_website, medium, style, color_scheme, width, height,
+            include_text, include_cta, logo_description, client_tagline
+        )
+        return f"{prefix}{prompt}{suffix}"
+    
+    @staticmethod
+    def build_enhanced_prompts_batch(prompts, client_name, client_website, medium, style,
+                                     color_scheme, include_text, include_cta, dimensions,
+                                     logo_description="", client_tagline=""):
+        """Build enhanced prompts for several ad messages sharing the same campaign settings
         
-        return " ".join(enhanced_parts)
+        The shared boilerplate is rendered once and only the message differs per prompt;
+        each result matches build_enhanced_prompt for the same message.
+        """
+        width, height = dimensions
+        prefix, suffix = _render_stable_parts(
+            client_name, client_website, medium, style, color_scheme, width, height,
+            include_text, include_cta, logo_description, client_tagline
+        )
+        return [f"{prefix}{prompt}{suffix}" for prompt in prompts]
     
     @staticmethod
     def build_nano_banana_pro_prompt(base_prompt, use_search_grounding=False, text_rendering_mode=False):
         """Build enhanced prompt with Nano Banana Pro capabilities"""
+        enhancements = PromptTemplates.NANO_BANANA_PRO_ENHANCEMENTS
         prompt_parts = [base_prompt]
         
         if use_search_grounding:
-            prompt_parts.append(PromptTemplates.NANO_BANANA_PRO_ENHANCEMENTS["search_grounding"])
+            prompt_parts.append(enhancements["search_grounding"])
         
         if text_rendering_mode:
-            prompt_parts.append(PromptTemplates.NANO_BANANA_PRO_ENHANCEMENTS["text_rendering"])
+            prompt_parts.append(enhancements["text_rendering"])
         
-        prompt_parts.extend(PromptTemplates.NANO_BANANA_PRO_ENHANCEMENTS["quality_enhancement"])
+        prompt_parts.extend(enhancements["quality_enhancement"])
         
         return " ".join(prompt_parts)
     
@@ -261,48 +435,46 @@ class PromptBuilder:
         """Auto-detect if advanced features should be enabled"""
         prompt_lower = prompt.lower()
         
-        use_search = any(keyword in prompt_lower for keyword in PromptTemplates.DETECTION_KEYWORDS["search"])
-        use_text = any(keyword in prompt_lower for keyword in PromptTemplates.DETECTION_KEYWORDS["text"])
+        use_search = _DETECT_SEARCH_RE.search(prompt_lower) is not None
+        use_text = _DETECT_TEXT_RE.search(prompt_lower) is not None
         
         return use_search, use_text
     
     @staticmethod
     def extract_theme_keywords(content_prompt):
         """Extract theme keywords from content prompt, removing specific text to prevent duplication"""
-        if not content_prompt.strip():
-            return PromptTemplates.THEME_EXTRACTION["fallback_themes"]["empty"]
-        
-        filtered_prompt = content_prompt.lower()
-        sale_terms = PromptTemplates.THEME_EXTRACTION["sale_terms"]
-        skip_words = PromptTemplates.THEME_EXTRACTION["skip_words"]
-        
-        theme_words = []
-        words = filtered_prompt.split()
-        
-        for word in words:
-            if not any(term in word for term in sale_terms) and not word.isdigit():
-                if len(word) > 2 and word not in skip_words:
-                    theme_words.append(word)
-        
-        if not theme_words:
-            return PromptTemplates.THEME_EXTRACTION["fallback_themes"]["no_words"]
-        
-        clean_theme = " ".join(theme_words[:5])
-        return f"{clean_theme} theme with professional aesthetic"
+        return _extract_theme_keywords(content_prompt)
     
     @staticmethod
     def analyze_logo_details(logo_file):
         """Generate logo analysis for AI prompt"""
         try:
-            if hasattr(logo_file, 'seek') and hasattr(logo_file, 'read'):
-                logo_file.seek(0)
-                from PIL import Image
-                logo_image = Image.open(logo_file)
-                
-                width, height = logo_image.size
-                aspect_ratio = "square" if abs(width - height) < 50 else ("horizontal" if width > height else "vertical")
-                
-                return PromptTemplates.LOGO_ANALYSIS["basic"].format(aspect_ratio=aspect_ratio)
-                
+            seek, read = logo_file.seek, logo_file.read
+        except AttributeError:
+            # Not a file-like object (e.g. an already decoded PIL image) - nothing to analyse
+            return None
+        
+        try:
+            # The same logo is analysed for every ad in a campaign - key on its header
+            # bytes and size so repeat calls skip re-opening it with PIL
+            seek(0, 2)
+            size = logo_file.tell()
+            seek(0)
+            key = (hashlib.blake2b(read(4096), digest_size=16).digest(), size)
+            cached = _LOGO_ANALYSIS_CACHE.get(key)
+            if cached is not None:
+                return cached
+            
+            seek(0)
+            from PIL import Image
+            logo_image = Image.open(logo_file)
+            
+            width, height = logo_image.size
+            description = _LOGO_DESCRIPTIONS[0 if abs(width - height) < 50 else (1 if width > height else 2)]
+            if len(_LOGO_ANALYSIS_CACHE) >= _LOGO_CACHE_MAX:
+                _LOGO_ANALYSIS_CACHE.clear()
+            _LOGO_ANALYSIS_CACHE[key] = description
+            return description
+            
         except Exception:
             return PromptTemplates.LOGO_ANALYSIS["fallback"]
\ No newline at end of file
@@ -6,12 +6,30 @@ Provides visual template editor with drag-and-drop functionality
 import streamlit as st
 import json
 import os
-from typing import Dict, List, Any, Optional
+import threading
+from typing import Dict, List, Tuple, Any, Optional
 from PIL import Image, ImageDraw, ImageFont
-from dataclasses import dataclass, asdict
-from copy import deepcopy
+from dataclasses import dataclass, field
+import functools
+from utils.template_manager import TemplateManager
 
-@dataclass
+try:
+    import orjson as _orjson
+except ImportError:
+    _orjson = None
+
+# Custom template names per directory, keyed by the directory's mtime
+_CUSTOM_TEMPLATES_CACHE = {}
+
+@functools.lru_cache(maxsize=64)
+def _get_font(size: int):
+    """Load the preview font once per size, falling back to Pillow's default"""
+    try:
+        return ImageFont.truetype("arial.ttf", size)
+    except (OSError, ValueError):
+        return ImageFont.load_default()
+
+@dataclass(slots=True)
 class TemplateElement:
     """Represents a single element in a template"""
     type: str  # 'logo', 'text', 'button', 'shape'
@@ -33,8 +51,22 @@ class TemplateElement:
             self.style = {}
         if self.size is None:
             self.size = {"width": 200, "height": 100}
+    
+    def to_dict(self) -> Dict:
+        """Shallow dict of all fields for JSON serialization (no deep copy like asdict)"""
+        return {
+            "type": self.type,
+            "id": self.id,
+            "content": self.content,
+            "style": self.style,
+            "size": self.size,
+            "placement_hint": self.placement_hint,
+            "priority": self.priority,
+            "integration": self.integration,
+            "position": self.position
+        }
 
-@dataclass
+@dataclass(slots=True)
 class TemplateLayout:
     """Complete template layout definition"""
     name: str
@@ -43,6 +75,8 @@ class TemplateLayout:
     background_style: Dict = None
     positioning_mode: str = "pixel"  # 'pixel', 'zone', or 'semantic'
     design_rules: List[str] = None  # For AI-native mode
+    # Dimensions as a tuple for Image.new and cache keys; dimensions is never mutated in place
+    _dims_tuple: Tuple[int, int] = field(init=False, repr=False, compare=False)
     
     def __post_init__(self):
         if self.background_style is None:
@@ -51,6 +85,111 @@ class TemplateLayout:
             self.positioning_mode = "pixel"
         if self.design_rules is None:
             self.design_rules = []
+        self._dims_tuple = tuple(self.dimensions)
+    
+    def to_dict(self) -> Dict:
+        """Serializable template dict as written to the custom templates directory"""
+        template_dict = {
+            "name": self.name,
+            "dimensions": self.dimensions,
+            "elements": [element.to_dict() for element in self.elements],
+            "background_style": self.background_style,
+            "positioning_mode": self.positioning_mode
+        }
+        
+        # Add design_rules if AI-native
+        if self.design_rules:
+            template_dict["design_rules"] = self.design_rules
+        return template_dict
+
+# Default element sizes as functions of the canvas (width, height)
+_LOGO_SIZE = lambda width, height: (min(300, width//6), min(150, height//7))
+_TITLE_SIZE = lambda width, height: (width//2, height//8)
+_TAGLINE_SIZE = lambda width, height: (width//3, height//15)
+_MAIN_MESSAGE_SIZE = lambda width, height: (int(width*0.8), height//4)
+_CTA_SIZE = lambda width, height: (300, 100)
+
+_TITLE_STYLE = {"font_family": "Arial", "font_size": 60, "color": "#FFFFFF", "weight": "bold"}
+_TAGLINE_STYLE = {"font_family": "Arial", "font_size": 30, "color": "#CCCCCC"}
+_MAIN_MESSAGE_STYLE = {"font_family": "Arial", "font_size": 48, "color": "#FFFFFF", "weight": "normal"}
+_CTA_BUTTON_STYLE = {"bg_color": "#FF6600", "text_color": "#FFFFFF", "font_size": 32, "border_radius": 10}
+
+# Default elements per mode: (type, id, content, size, style, extra fields). Extra
+# field values may be callables of (width, height); dicts are copied per element
+_AI_NATIVE_DEFAULTS = (
+    ("logo", "logo_1", "{{logo}}", _LOGO_SIZE, {}, {
+        "placement_hint": "upper architectural area with clean negative space",
+        "priority": "low",
+        "integration": "logo will be added post-generation; reserve subtle space only"}),
+    ("text", "company_name", "{{client_name}}", _TITLE_SIZE,
+     {"style_hint": "premium brand signage, subtle illumination, physically embedded"}, {
+        "placement_hint": "architectural branding surface near the upper area of the scene",
+        "priority": "high",
+        "integration": "engraved, mounted, or illuminated branding element"}),
+    ("text", "tagline_1", "{{client_tagline}}", _TAGLINE_SIZE,
+     {"style_hint": "minimal, elegant, unobtrusive"}, {
+        "placement_hint": "secondary nearby surface, visually subordinate to the brand name",
+        "priority": "low",
+        "integration": "small supporting text on a wall or panel"}),
+    ("text", "main_message_1", "{{main_message}}", _MAIN_MESSAGE_SIZE,
+     {"style_hint": "large cinematic typography, dominant, scene-integrated"}, {
+        "placement_hint": "dominant architectural surface clearly visible from the main viewpoint",
+        "priority": "highest",
+        "integration": "large-scale physical signage or illuminated wall feature"}),
+    ("text", "cta_text_1", "{{cta_text}}", _CTA_SIZE,
+     {"style_hint": "short, clear, understated"}, {
+        "placement_hint": "small nearby signage element, not separated from the scene",
+        "priority": "medium",
+        "integration": "environmental call-to-action text, not a button"})
+)
+
+_ZONE_DEFAULTS = (
+    ("logo", "logo_1", "{{logo}}", _LOGO_SIZE, {"opacity": 1.0}, {
+        "position": {"zone": "top-left", "priority": "low", "integration": "subtle, blended into environment"}}),
+    ("text", "title_1", "{{client_name}}", _TITLE_SIZE, _TITLE_STYLE, {
+        "position": {"zone": "top-center", "priority": "high", "integration": "naturally embedded, cinematic"}}),
+    ("text", "tagline_1", "{{client_tagline}}", _TAGLINE_SIZE, _TAGLINE_STYLE, {
+        "position": {"zone": "top-right", "priority": "low", "integration": "subtle, secondary text"}}),
+    ("text", "main_message_1", "{{main_message}}", _MAIN_MESSAGE_SIZE, _MAIN_MESSAGE_STYLE, {
+        "position": {"zone": "center-left", "priority": "highest", "integration": "part of the scene, readable but not flat"}}),
+    ("button", "cta_button_1", "{{cta_text}}", _CTA_SIZE, _CTA_BUTTON_STYLE, {
+        "position": {"zone": "bottom-center", "priority": "medium", "integration": "naturally integrated"}})
+)
+
+_PIXEL_DEFAULTS = (
+    ("logo", "logo_1", "{{logo}}", _LOGO_SIZE, {"opacity": 1.0}, {
+        "position": lambda width, height: {"x": 50, "y": 50}}),
+    ("text", "title_1", "{{client_name}}", _TITLE_SIZE, _TITLE_STYLE, {
+        "position": lambda width, height: {"x": width//4, "y": 50}}),
+    ("text", "tagline_1", "{{client_tagline}}", lambda width, height: (width//2, height//15), _TAGLINE_STYLE, {
+        "position": lambda width, height: {"x": width//4, "y": height//5}}),
+    ("text", "main_message_1", "{{main_message}}", _MAIN_MESSAGE_SIZE, _MAIN_MESSAGE_STYLE, {
+        "position": lambda width, height: {"x": 50, "y": height//2}}),
+    ("button", "cta_button_1", "{{cta_text}}", _CTA_SIZE, _CTA_BUTTON_STYLE, {
+        "position": lambda width, height: {"x": width-350, "y": height-150}})
+)
+
+def _build_default_elements(specs, width: int, height: int) -> List[TemplateElement]:
+    """Instantiate a default element table for a canvas size"""
+    elements = []
+    for element_type, element_id, content, size, style, extra in specs:
+        element_width, element_height = size(width, height)
+        fields = {}
+        for key, value in extra.items():
+            if callable(value):
+                value = value(width, height)
+            elif isinstance(value, dict):
+                value = dict(value)
+            fields[key] = value
+        elements.append(TemplateElement(
+            type=element_type,
+            id=element_id,
+            content=content,
+            size={"width": element_width, "height": element_height},
+            style=dict(style),
+            **fields
+        ))
+    return elements
 
 class EditableTemplateManager:
     """Manager for editable custom templates"""
@@ -68,148 +207,11 @@ class EditableTemplateManager:
             # Zone-based or semantic positioning
             if is_ai_native:
                 # AI-Native mode: NEW SIMPLIFIED STRUCTURE (placement_hint at element level)
-                elements = [
-                    TemplateElement(
-                        type="logo",
-                        id="logo_1",
-                        placement_hint="upper architectural area with clean negative space",
-                        priority="low",
-                        integration="logo will be added post-generation; reserve subtle space only",
-                        size={"width": min(300, width//6), "height": min(150, height//7)},
-                        content="{{logo}}",
-                        style={}
-                    ),
-                    TemplateElement(
-                        type="text",
-                        id="company_name", 
-                        placement_hint="architectural branding surface near the upper area of the scene",
-                        priority="high",
-                        integration="engraved, mounted, or illuminated branding element",
-                        size={"width": width//2, "height": height//8},
-                        content="{{client_name}}",
-                        style={"style_hint": "premium brand signage, subtle illumination, physically embedded"}
-                    ),
-                    TemplateElement(
-                        type="text",
-                        id="tagline_1",
-                        placement_hint="secondary nearby surface, visually subordinate to the brand name",
-                        priority="low",
-                        integration="small supporting text on a wall or panel",
-                        size={"width": width//3, "height": height//15},
-                        content="{{client_tagline}}",
-                        style={"style_hint": "minimal, elegant, unobtrusive"}
-                    ),
-                    TemplateElement(
-                        type="text",
-                        id="main_message_1",
-                        placement_hint="dominant architectural surface clearly visible from the main viewpoint",
-                        priority="highest",
-                        integration="large-scale physical signage or illuminated wall feature",
-                        size={"width": int(width*0.8), "height": height//4},
-                        content="{{main_message}}",
-                        style={"style_hint": "large cinematic typography, dominant, scene-integrated"}
-                    ),
-                    TemplateElement(
-                        type="text",
-                        id="cta_text_1",
-                        placement_hint="small nearby signage element, not separated from the scene",
-                        priority="medium",
-                        integration="environmental call-to-action text, not a button",
-                        size={"width": 300, "height": 100},
-                        content="{{cta_text}}",
-                        style={"style_hint": "short, clear, understated"}
-                    )
-                ]
-            else:
-                # Overlay mode: use traditional font specs with position dict
-                elements = [
-                    TemplateElement(
-                        type="logo",
-                        id="logo_1",
-                        position={"zone": "top-left", "priority": "low", "integration": "subtle, blended into environment"},
-                        size={"width": min(300, width//6), "height": min(150, height//7)},
-                        content="{{logo}}",
-                        style={"opacity": 1.0}
-                    ),
-                    TemplateElement(
-                        type="text",
-                        id="title_1", 
-                        position={"zone": "top-center", "priority": "high", "integration": "naturally embedded, cinematic"},
-                        size={"width": width//2, "height": height//8},
-                        content="{{client_name}}",
-                        style={"font_family": "Arial", "font_size": 60, "color": "#FFFFFF", "weight": "bold"}
-                    ),
-                    TemplateElement(
-                        type="text",
-                        id="tagline_1",
-                        position={"zone": "top-right", "priority": "low", "integration": "subtle, secondary text"},
-                        size={"width": width//3, "height": height//15},
-                        content="{{client_tagline}}",
-                        style={"font_family": "Arial", "font_size": 30, "color": "#CCCCCC"}
-                    ),
-                    TemplateElement(
-                        type="text",
-                        id="main_message_1",
-                        position={"zone": "center-left", "priority": "highest", "integration": "part of the scene, readable but not flat"},
-                        size={"width": int(width*0.8), "height": height//4},
-                        content="{{main_message}}",
-                        style={"font_family": "Arial", "font_size": 48, "color": "#FFFFFF", "weight": "normal"}
-                    ),
-                    TemplateElement(
-                        type="button",
-                        id="cta_button_1",
-                        position={"zone": "bottom-center", "priority": "medium", "integration": "naturally integrated"},
-                        size={"width": 300, "height": 100},
-                        content="{{cta_text}}",
-                        style={"bg_color": "#FF6600", "text_color": "#FFFFFF", "font_size": 32, "border_radius": 10}
-                    )
-                ]
-            
-            return elements
-        else:
-            # Pixel-based default positions
-            return [
-                TemplateElement(
-                    type="logo",
-                    id="logo_1",
-                    position={"x": 50, "y": 50},
-                    size={"width": min(300, width//6), "height": min(150, height//7)},
-                    content="{{logo}}",
-                    style={"opacity": 1.0}
-                ),
-                TemplateElement(
-                    type="text",
-                    id="title_1", 
-                    position={"x": width//4, "y": 50},
-                    size={"width": width//2, "height": height//8},
-                    content="{{client_name}}",
-                    style={"font_family": "Arial", "font_size": 60, "color": "#FFFFFF", "weight": "bold"}
-                ),
-                TemplateElement(
-                    type="text",
-                    id="tagline_1",
-                    position={"x": width//4, "y": height//5},
-                    size={"width": width//2, "height": height//15},
-                    content="{{client_tagline}}",
-                    style={"font_family": "Arial", "font_size": 30, "color": "#CCCCCC"}
-                ),
-                TemplateElement(
-                    type="text",
-                    id="main_message_1",
-                    position={"x": 50, "y": height//2},
-                    size={"width": int(width*0.8), "height": height//4},
-                    content="{{main_message}}",
-                    style={"font_family": "Arial", "font_size": 48, "color": "#FFFFFF", "weight": "normal"}
-                ),
-                TemplateElement(
-                    type="button",
-                    id="cta_button_1",
-                    position={"x": width-350, "y": height-150},
-                    size={"width": 300, "height": 100},
-                    content="{{cta_text}}",
-                    style={"bg_color": "#FF6600", "text_color": "#FFFFFF", "font_size": 32, "border_radius": 10}
-                )
-            ]
+                return _build_default_elements(_AI_NATIVE_DEFAULTS, width, height)
+            # Overlay mode: use traditional font specs with position dict
+            return _build_default_elements(_ZONE_DEFAULTS, width, height)
+        # Pixel-based default positions
+        return _build_default_elements(_PIXEL_DEFAULTS, width, height)
     
     def create_template(self, name: str, dimensions: List[int], positioning_mode: str = "pixel", is_ai_native: bool = False) -> TemplateLayout:
         """Create a new editable template"""
@@ -238,26 +240,29 @@ class EditableTemplateManager:
         return template
     
     def save_template(self, template: TemplateLayout) -> bool:
-        """Save template to custom templates directory"""
+        """Save template to custom templates directory (atomically replacing any existing file)"""
         try:
             filename = f"{template.name.replace(' ', '_').lower()}.json"
             filepath = os.path.join(self.custom_templates_dir, filename)
             
             # Convert to serializable format
-            template_dict = {
-                "name": template.name,
-                "dimensions": template.dimensions,
-                "elements": [asdict(element) for element in template.elements],
-                "background_style": template.background_style,
-                "positioning_mode": template.positioning_mode
-            }
-            
-            # Add design_rules if AI-native
-            if template.design_rules:
-                template_dict["design_rules"] = template.design_rules
+            template_dict = template.to_dict()
             
-            with open(filepath, 'w') as f:
-                json.dump(template_dict, f, indent=2)
+            if _orjson is not None:
+                data = _orjson.dumps(template_dict, option=_orjson.OPT_INDENT_2)
+            else:
+                data = json.dumps(template_dict, indent=2).encode()
+            # Write to a per-thread temp file and swap it in, so a failed or concurrent
+            # save never leaves a partially written template behind
+            tmp_path = f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, filepath)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
             
             return True
         except Exception as e:
@@ -273,8 +278,9 @@ class EditableTemplateManager:
             if not os.path.exists(filepath):
                 return None
             
-            with open(filepath, 'r') as f:
-                data = json.load(f)
+            with open(filepath, 'rb') as f:
+                raw = f.read()
+            data = _orjson.loads(raw) if _orjson is not None else json.loads(raw)
             
             elements = [TemplateElement(**elem) for elem in data["elements"]]
             template = TemplateLayout(
@@ -293,15 +299,23 @@ class EditableTemplateManager:
     
     def get_custom_templates(self) -> List[str]:
         """Get list of custom template names"""
-        if not os.path.exists(self.custom_templates_dir):
+        directory = self.custom_templates_dir
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
             return []
         
-        templates = []
-        for filename in os.listdir(self.custom_templates_dir):
-            if filename.endswith('.json'):
-                template_name = filename[:-5].replace('_', ' ').title()
-                templates.append(template_name)
-        return templates
+        # Adding, removing or renaming a template bumps the directory mtime
+        cached = _CUSTOM_TEMPLATES_CACHE.get(directory)
+        if cached is None or cached[0] != mtime:
+            with os.scandir(directory) as entries:
+                names = [
+                    entry.name.removesuffix('.json').replace('_', ' ').title()
+                    for entry in entries
+                    if entry.name.endswith('.json') and entry.is_file()
+                ]
+            cached = _CUSTOM_TEMPLATES_CACHE[directory] = (mtime, names)
+        return list(cached[1])
 
 def show_template_editor():
     """Main template editor interface"""
@@ -482,6 +496,129 @@ def show_template_editor():
         st.markdown("---")
         show_visual_editor(st.session_state.editing_template, manager)
 
+# Zone labels with their centres in sixths of the canvas (column, row)
+_ZONE_LABELS = (
+    ("top-left", 1, 1), ("top-center", 3, 1), ("top-right", 5, 1),
+    ("center-left", 1, 3), ("center", 3, 3), ("center-right", 5, 3),
+    ("bottom-left", 1, 5), ("bottom-center", 3, 5), ("bottom-right", 5, 5)
+)
+
+@functools.lru_cache(maxsize=4)
+def _zone_grid_overlay(width: int, height: int) -> Image.Image:
+    """Transparent layer with the 3x3 zone grid and labels, drawn once per canvas size"""
+    overlay = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(overlay)
+    
+    # Draw light grid lines to show zones
+    grid_color = '#d0d0d0'
+    # Vertical lines (3 columns)
+    draw.line([(width//3, 0), (width//3, height)], fill=grid_color, width=1)
+    draw.line([(2*width//3, 0), (2*width//3, height)], fill=grid_color, width=1)
+    # Horizontal lines (3 rows)
+    draw.line([(0, height//3), (width, height//3)], fill=grid_color, width=1)
+    draw.line([(0, 2*height//3), (width, 2*height//3)], fill=grid_color, width=1)
+    
+    # Add zone labels
+    zone_font = _get_font(14)
+    for label, col, row in _ZONE_LABELS:
+        draw.text((col*width//6, row*height//6), label, fill='#999999', anchor="mm", font=zone_font)
+    return overlay
+
+# Preview box per element type: (style key overriding the fill, fill, outline, outline width)
+_PREVIEW_BOXES = {
+    "logo": (None, '#9B59B6', '#8E44AD', 3),  # purple/blue
+    "text": (None, '#3498DB', '#2980B9', 2),  # light blue
+    "button": ('bg_color', '#FF6600', '#E55D00', 3),  # orange
+    "shape": ('fill_color', '#95A5A6', '#7F8C8D', 2)  # gray
+}
+
+def _zone_position(position: Dict, width: int, height: int) -> Tuple[int, int]:
+    """Pixel position of a zone-based element, as TemplateManager._resolve_position computes it"""
+    if 'x' in position and 'y' in position:
+        return position['x'], position['y']
+    x_ratio, y_ratio = TemplateManager.ZONE_POSITIONS.get(position.get('zone', 'center'), (0.35, 0.4))
+    return int(width * x_ratio), int(height * y_ratio)
+
+def _draw_logo_label(draw, x, y, w, h, element):
+    draw.text((x+w//2, y+h//2), "LOGO", fill='white', anchor="mm", font=_get_font(min(30, h//3)))
+
+def _draw_text_label(draw, x, y, w, h, element):
+    font = _get_font(min(element.style.get('font_size', 30), h//2))
+    text_preview = element.content[:20] if element.content else "Text"
+    draw.text((x+10, y+h//2), text_preview, fill='white', anchor="lm", font=font)
+
+def _draw_button_label(draw, x, y, w, h, element):
+    btn_text = element.content[:15] if element.content else "Button"
+    draw.text((x+w//2, y+h//2), btn_text, fill='white', anchor="mm", font=_get_font(min(24, h//2)))
+
+# Label drawn inside each element's preview box (shapes have none)
+_PREVIEW_LABELS = {
+    "logo": _draw_logo_label,
+    "text": _draw_text_label,
+    "button": _draw_button_label
+}
+
+def _preview_key(template: TemplateLayout):
+    """Snapshot of everything the preview drawing depends on
+    
+    Built from tuples rather than the element dicts themselves, so in-place edits
+    to the template make it compare unequal to the stored key.
+    """
+    return (
+        template.name, template._dims_tuple, template.positioning_mode,
+        tuple(
+            (element.type, element.content,
+             tuple(sorted(element.size.items())), tuple(sorted(element.style.items())),
+             tuple(sorted(element.position.items())) if element.position is not None else None)
+            for element in template.elements
+        )
+    )
+
+def _draw_template_preview(template: TemplateLayout) -> Image.Image:
+    """Draw the layout preview: zone grid (zone templates) plus a box per element"""
+    # Check template's positioning mode
+    is_zone_template = (template.positioning_mode == "zone")
+    
+    # Create visual preview image
+    preview_img = Image.new('RGB', template._dims_tuple, color='#f0f0f0')
+    draw = ImageDraw.Draw(preview_img)
+    
+    # Draw zone grid overlay if this is a zone-based template
+    if is_zone_template:
+        grid = _zone_grid_overlay(*template._dims_tuple)
+        preview_img.paste(grid, (0, 0), grid)
+    
+    # Draw elements on preview
+    width, height = template._dims_tuple
+    if template.elements:
+        for i, element in enumerate(template.elements):
+            # Resolve position (zone or pixel)
+            if 'zone' in element.position:
+                # For zone-based, calculate approximate position for preview
+                x, y = _zone_position(element.position, width, height)
+            else:
+                x = element.position['x']
+                y = element.position['y']
+            
+            size = element.size
+            w, h = size['width'], size['height']
+            element_type = element.type
+            
+            # Draw element box based on type
+            box = _PREVIEW_BOXES.get(element_type)
+            if box is not None:
+                fill_key, fill, outline, outline_width = box
+                if fill_key:
+                    fill = element.style.get(fill_key, fill)
+                draw.rectangle([x, y, x+w, y+h], fill=fill, outline=outline, width=outline_width)
+            
+            # Add element label
+            label = _PREVIEW_LABELS.get(element_type)
+            if label is not None:
+                label(draw, x, y, w, h, element)
+    
+    return preview_img
+
 def show_visual_editor(template: TemplateLayout, manager: EditableTemplateManager):
     """Visual template editor interface"""
     mode_icon = "🎯" if template.positioning_mode == "zone" else "📍"
@@ -495,101 +632,14 @@ def show_visual_editor(template: TemplateLayout, manager: EditableTemplateManage
     with preview_col:
         st.markdown("#### 🎨 Template Preview")
         
-        # Check template's positioning mode
-        is_zone_template = (template.positioning_mode == "zone")
-        
-        # Create visual preview image
-        preview_img = Image.new('RGB', tuple(template.dimensions), color='#f0f0f0')
-        draw = ImageDraw.Draw(preview_img)
-        
-        # Draw zone grid overlay if this is a zone-based template
-        if is_zone_template:
-            width, height = template.dimensions
-            # Draw light grid lines to show zones
-            grid_color = '#d0d0d0'
-            # Vertical lines (3 columns)
-            draw.line([(width//3, 0), (width//3, height)], fill=grid_color, width=1)
-            draw.line([(2*width//3, 0), (2*width//3, height)], fill=grid_color, width=1)
-            # Horizontal lines (3 rows)
-            draw.line([(0, height//3), (width, height//3)], fill=grid_color, width=1)
-            draw.line([(0, 2*height//3), (width, 2*height//3)], fill=grid_color, width=1)
-            
-            # Add zone labels
-            try:
-                zone_font = ImageFont.truetype("arial.ttf", 14)
-            except:
-                zone_font = ImageFont.load_default()
-            
-            zone_labels = [
-                ("top-left", width//6, height//6),
-                ("top-center", width//2, height//6),
-                ("top-right", 5*width//6, height//6),
-                ("center-left", width//6, height//2),
-                ("center", width//2, height//2),
-                ("center-right", 5*width//6, height//2),
-                ("bottom-left", width//6, 5*height//6),
-                ("bottom-center", width//2, 5*height//6),
-                ("bottom-right", 5*width//6, 5*height//6)
-            ]
-            for label, x, y in zone_labels:
-                draw.text((x, y), label, fill='#999999', anchor="mm", font=zone_font)
-        
-        # Draw elements on preview
-        if template.elements:
-            for i, element in enumerate(template.elements):
-                # Resolve position (zone or pixel)
-                if 'zone' in element.position:
-                    # For zone-based, calculate approximate center position for preview
-                    from utils.template_manager import TemplateManager
-                    tm = TemplateManager()
-                    pos = tm._resolve_position(element.position, template.dimensions)
-                    x, y = pos['x'], pos['y']
-                else:
-                    x = element.position['x']
-                    y = element.position['y']
-                
-                w = element.size['width']
-                h = element.size['height']
-                
-                # Draw element box based on type
-                if element.type == "logo":
-                    # Logo area - purple/blue
-                    draw.rectangle([x, y, x+w, y+h], fill='#9B59B6', outline='#8E44AD', width=3)
-                    # Add text label
-                    try:
-                        font = ImageFont.truetype("arial.ttf", min(30, h//3))
-                    except:
-                        font = ImageFont.load_default()
-                    draw.text((x+w//2, y+h//2), "LOGO", fill='white', anchor="mm", font=font)
-                    
-                elif element.type == "text":
-                    # Text area - light blue
-                    draw.rectangle([x, y, x+w, y+h], fill='#3498DB', outline='#2980B9', width=2)
-                    # Add text label
-                    try:
-                        font_size = min(element.style.get('font_size', 30), h//2)
-                        font = ImageFont.truetype("arial.ttf", font_size)
-                    except:
-                        font = ImageFont.load_default()
-                    text_preview = element.content[:20] if element.content else "Text"
-                    draw.text((x+10, y+h//2), text_preview, fill='white', anchor="lm", font=font)
-                    
-                elif element.type == "button":
-                    # Button - orange
-                    bg_color = element.style.get('bg_color', '#FF6600')
-                    draw.rectangle([x, y, x+w, y+h], fill=bg_color, outline='#E55D00', width=3)
-                    # Add button text
-                    try:
-                        font = ImageFont.truetype("arial.ttf", min(24, h//2))
-                    except:
-                        font = ImageFont.load_default()
-                    btn_text = element.content[:15] if element.content else "Button"
-                    draw.text((x+w//2, y+h//2), btn_text, fill='white', anchor="mm", font=font)
-                    
-                elif element.type == "shape":
-                    # Shape - gray
-                    fill_color = element.style.get('fill_color', '#95A5A6')
-                    draw.rectangle([x, y, x+w, y+h], fill=fill_color, outline='#7F8C8D', width=2)
+        # Redraw only when the template changed since the last rerun
+        key = _preview_key(template)
+        cached = st.session_state.get('_preview_cache')
+        if cached is not None and cached[0] == key:
+            preview_img = cached[1]
+        else:
+            preview_img = _draw_template_preview(template)
+            st.session_state._preview_cache = (key, preview_img)
         
         # Display the preview image
         st.image(preview_img, caption=f"Template Layout Preview - {template.dimensions[0]}×{template.dimensions[1]}px", width='stretch')